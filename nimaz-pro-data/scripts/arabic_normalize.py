@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Normalize Arabic text into a plain search form.
+
+Users type Arabic without diacritics and with whichever alef/hamza/ya they
+are used to, while ayahs and hadiths are stored fully vocalized (Uthmani
+script).  normalize_arabic() reduces both sides to the same form:
+
+  - Unicode NFKD, which splits hamza/madda carriers (أ إ آ ؤ ئ) into a
+    base letter plus a combining mark and folds presentation forms
+  - all combining marks dropped: tashkeel, shadda, sukun, superscript
+    (dagger) alef and the small Quranic annotation signs
+  - tatweel, small waw/ya and Quranic symbols (rub el hizb, sajdah) dropped
+  - alef wasla -> alef, alef maksura -> ya, ta marbuta -> ha
+  - runs of whitespace collapsed to one space
+
+The dagger alef is dropped rather than written out, so ٱلرَّحْمَٰنِ becomes
+الرحمن, matching how the word is normally typed.
+
+Run standalone to normalize the arguments (or stdin) for testing queries.
+"""
+
+import unicodedata
+
+# Letters folded after NFKD (hamza forms are already split by then)
+LETTER_MAP = {
+    '\u0671': '\u0627',  # alef wasla -> alef
+    '\u0672': '\u0627',  # alef with wavy hamza above -> alef
+    '\u0673': '\u0627',  # alef with wavy hamza below -> alef
+    '\u0649': '\u064a',  # alef maksura -> ya
+    '\u06cc': '\u064a',  # farsi yeh -> ya
+    '\u0629': '\u0647',  # ta marbuta -> ha
+    '\u06a9': '\u0643',  # keheh -> kaf
+}
+
+# Non-mark characters with no place in a search form
+DROPPED_CHARS = {
+    '\u0640',  # tatweel
+    '\u06e5',  # small waw
+    '\u06e6',  # small yeh
+    '\u06de',  # start of rub el hizb
+    '\u06e9',  # place of sajdah
+    '\ufeff',  # zero width no-break space
+    '\u200c', '\u200d', '\u200e', '\u200f',  # zero width (non-)joiner, direction marks
+}
+
+_cache = {}
+
+
+def _fold_char(ch):
+    """Search form of a single (decomposed) character, '' to drop it"""
+    folded = _cache.get(ch)
+    if folded is None:
+        if ch in DROPPED_CHARS or unicodedata.category(ch).startswith('M'):
+            folded = ''
+        else:
+            folded = LETTER_MAP.get(ch, ch)
+        _cache[ch] = folded
+    return folded
+
+
+def normalize_arabic(text):
+    """Return the search form of an Arabic string (see module docstring)"""
+    if not text:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ' '.join(''.join(_fold_char(ch) for ch in decomposed).split())
+
+
+if __name__ == "__main__":
+    import sys
+
+    lines = sys.argv[1:] or sys.stdin.read().splitlines()
+    for line in lines:
+        print(normalize_arabic(line))
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Compare the app's LIKE '%query%' searches with FTS5 MATCH on the generated
+database (build it with `generate_database.py --fts`).
+
+The LIKE queries are the ones in QuranDao, HadithDao and TafseerDao.  Note
+the two are not equivalent: LIKE matches any substring, MATCH matches whole
+tokens (or token prefixes with a trailing *), so result counts can differ.
+The ayah_search / hadith_search rows search the normalized Arabic side
+tables with the query normalized the same way (see arabic_normalize).
+
+Usage:
+    python benchmark_search.py [--db PATH] [--repeat N] [query ...]
+"""
+
+import argparse
+import sqlite3
+import time
+from pathlib import Path
+
+from arabic_normalize import normalize_arabic
+
+DB_FILE = Path(__file__).parent.parent / "output" / "nimaz_prepopulated.db"
+
+DEFAULT_QUERIES = ["mercy", "prayer", "paradise", "الله", "الرحمن"]
+
+# (label, LIKE query, FTS equivalent, normalize query); ? is the search term.
+# label + "_fts" is the FTS table the comparison needs.
+SEARCHES = [
+    ("ayahs",
+     "SELECT * FROM ayahs WHERE text_uthmani LIKE '%' || ? || '%' OR text_arabic LIKE '%' || ? || '%'",
+     "SELECT a.* FROM ayahs_fts JOIN ayahs a ON a.id = ayahs_fts.rowid WHERE ayahs_fts MATCH ?", False),
+    ("translations",
+     "SELECT * FROM translations WHERE text LIKE '%' || ? || '%'",
+     "SELECT t.* FROM translations_fts JOIN translations t ON t.id = translations_fts.rowid "
+     "WHERE translations_fts MATCH ?", False),
+    ("hadiths",
+     "SELECT * FROM hadiths WHERE text_english LIKE '%' || ? || '%' OR text_arabic LIKE '%' || ? || '%'",
+     "SELECT h.* FROM hadiths_fts JOIN hadiths h ON h.id = hadiths_fts.rowid WHERE hadiths_fts MATCH ?", False),
+    ("tafseer_texts",
+     "SELECT * FROM tafseer_texts WHERE text LIKE '%' || ? || '%'",
+     "SELECT t.* FROM tafseer_texts_fts JOIN tafseer_texts t ON t.id = tafseer_texts_fts.rowid "
+     "WHERE tafseer_texts_fts MATCH ?", False),
+    ("ayah_search",
+     "SELECT a.* FROM ayah_search s JOIN ayahs a ON a.id = s.id WHERE s.text LIKE '%' || ? || '%'",
+     "SELECT a.* FROM ayah_search_fts JOIN ayahs a ON a.id = ayah_search_fts.rowid "
+     "WHERE ayah_search_fts MATCH ?", True),
+    ("hadith_search",
+     "SELECT h.* FROM hadith_search s JOIN hadiths h ON h.id = s.id WHERE s.text LIKE '%' || ? || '%'",
+     "SELECT h.* FROM hadith_search_fts JOIN hadiths h ON h.id = hadith_search_fts.rowid "
+     "WHERE hadith_search_fts MATCH ?", True),
+]
+
+
+def fts_phrase(query):
+    """Quote a user query as a single FTS5 phrase"""
+    return '"' + query.replace('"', '""') + '"'
+
+
+def time_query(conn, sql, params, repeat):
+    """Best wall time over `repeat` runs and the result row count"""
+    best = float('inf')
+    rows = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = len(conn.execute(sql, params).fetchall())
+        best = min(best, time.perf_counter() - start)
+    return best, rows
+
+
+def benchmark(db_path, queries, repeat=5):
+    conn = sqlite3.connect(db_path)
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+    print(f"{'Table':<15}{'Query':<12}{'LIKE ms':>10}{'rows':>8}{'MATCH ms':>10}{'rows':>8}{'Speedup':>9}")
+    print("-" * 72)
+    totals = {'like': 0.0, 'match': 0.0}
+    for label, like_sql, fts_sql, normalize in SEARCHES:
+        fts_table = f"{label}_fts"
+        if fts_table not in tables:
+            print(f"{label:<15}(no {fts_table}; build with --fts)")
+            continue
+        for query in queries:
+            if normalize:
+                query = normalize_arabic(query)
+                if not query:
+                    continue
+            like_params = (query,) * like_sql.count('?')
+            like_time, like_rows = time_query(conn, like_sql, like_params, repeat)
+            match_time, match_rows = time_query(conn, fts_sql, (fts_phrase(query),), repeat)
+            totals['like'] += like_time
+            totals['match'] += match_time
+            speedup = like_time / match_time if match_time > 0 else 0
+            print(f"{label:<15}{query:<12}{like_time * 1000:>10.2f}{like_rows:>8}"
+                  f"{match_time * 1000:>10.2f}{match_rows:>8}{speedup:>8.1f}x")
+    print("-" * 72)
+    if totals['match'] > 0:
+        print(f"Total: LIKE {totals['like'] * 1000:.1f} ms, MATCH {totals['match'] * 1000:.1f} ms "
+              f"({totals['like'] / totals['match']:.1f}x), best of {repeat}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare LIKE searches with FTS5 MATCH")
+    parser.add_argument('--db', type=Path, default=DB_FILE, help=f"database to query (default: {DB_FILE})")
+    parser.add_argument('--repeat', type=int, default=5, help="runs per query, best is kept (default: 5)")
+    parser.add_argument('queries', nargs='*', metavar='query',
+                        help=f"search terms (default: {' '.join(DEFAULT_QUERIES)})")
+    args = parser.parse_args()
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+    if not args.db.exists():
+        parser.error(f"{args.db} not found")
+    benchmark(args.db, args.queries or DEFAULT_QUERIES, args.repeat)
@@ -4,15 +4,16 @@ Nimaz Pro - Complete Data Download and Generation Script
 Downloads Quran, Hadith, Duas data and generates SQLite database
 """
 
-import json
 import os
 import sqlite3
-import urllib.request
-import urllib.error
 import ssl
 from pathlib import Path
 from typing import Dict, List, Any
 
+from http_cache import http_cache
+from json_stream import load_data, save_data
+from staging import stage_data
+
 # Disable SSL verification for GitHub raw content (if needed)
 ssl._create_default_https_context = ssl._create_unverified_context
 
@@ -51,19 +52,16 @@ def download_json(url: str) -> Any:
     """Download and parse JSON from URL"""
     print(f"  Downloading: {url}")
     try:
-        req = urllib.request.Request(url, headers={'User-Agent': 'Mozilla/5.0'})
-        with urllib.request.urlopen(req, timeout=60) as response:
-            return json.loads(response.read().decode('utf-8'))
+        return http_cache.get_json(url, timeout=60)
     except Exception as e:
         print(f"  Error downloading {url}: {e}")
         return None
 
 def save_json(data: Any, filename: str):
-    """Save data to JSON file"""
-    filepath = JSON_DIR / filename
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    print(f"  Saved: {filename}")
+    """Save data to the json/ directory in the configured data format, and stage it"""
+    filepath = save_data(JSON_DIR, filename, data)
+    stage_data(JSON_DIR, filename, data)
+    print(f"  Saved: {filepath.name}")
 
 def download_quran_data():
     """Download Quran surahs, ayahs, and translations"""
@@ -1127,11 +1125,7 @@ def create_database():
     print("  Populating database...")
 
     def load_json(filename):
-        filepath = JSON_DIR / filename
-        if filepath.exists():
-            with open(filepath, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return []
+        return load_data(JSON_DIR, filename, default=[])
 
     # Surahs
     surahs = load_json('surahs.json')
@@ -1269,6 +1263,7 @@ def main():
     print("="*60)
     print(f"\nDatabase ready at: {db_path}")
     print(f"\nCopy to: app/src/main/assets/database/nimaz_prepopulated.db")
+    http_cache.print_stats()
 
 if __name__ == "__main__":
     main()
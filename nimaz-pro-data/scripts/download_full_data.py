@@ -7,12 +7,15 @@ Downloads complete Hadith collections and expands Duas
 import json
 import os
 import sqlite3
-import urllib.request
-import urllib.error
 import ssl
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
+
+from http_cache import http_cache
+from json_stream import save_data
+from staging import stage_data
 
 # Disable SSL verification
 ssl._create_default_https_context = ssl._create_unverified_context
@@ -33,120 +36,180 @@ HADITH_COLLECTIONS = [
     {"key": "ibnmajah", "book_id": 6, "name": "Sunan Ibn Majah", "arabic_key": "ara-ibnmajah", "english_key": "eng-ibnmajah"},
 ]
 
+# Concurrent edition downloads (12 CDN files)
+HADITH_DOWNLOAD_WORKERS = 4
+
 def download_json(url: str, retries: int = 3) -> Any:
     """Download and parse JSON from URL with retries"""
     for attempt in range(retries):
         try:
             print(f"    Downloading: {url}")
-            req = urllib.request.Request(url, headers={'User-Agent': 'Mozilla/5.0'})
-            with urllib.request.urlopen(req, timeout=120) as response:
-                return json.loads(response.read().decode('utf-8'))
+            return http_cache.get_json(url, timeout=120)
         except Exception as e:
             print(f"    Attempt {attempt + 1} failed: {e}")
             if attempt < retries - 1:
                 time.sleep(2)
     return None
 
+def download_to_file(url: str, retries: int = 3) -> Optional[Path]:
+    """Stream a URL into the HTTP cache with retries, returns the cached file path or None"""
+    for attempt in range(retries):
+        try:
+            print(f"    Downloading: {url}")
+            return http_cache.get_file(url, timeout=120)
+        except Exception as e:
+            print(f"    Attempt {attempt + 1} failed for {url}: {e}")
+            if attempt < retries - 1:
+                time.sleep(2)
+    return None
+
 def save_json(data: Any, filename: str):
-    """Save data to JSON file"""
-    filepath = JSON_DIR / filename
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    print(f"    Saved: {filename}")
+    """Save data to the json/ directory in the configured data format (see json_stream), and stage it"""
+    filepath = save_data(JSON_DIR, filename, data)
+    stage_data(JSON_DIR, filename, data)
+    print(f"    Saved: {filepath.name}")
+
+def load_edition(path: Path) -> Any:
+    """Parse a downloaded edition file, None if it is missing or invalid"""
+    if path is None:
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"    Could not parse {path.name}: {e}")
+        return None
+
+def build_collection_hadiths(collection: Dict, eng_data: Any, ara_data: Any, first_id: int = 1) -> List[Dict]:
+    """Merge the English and Arabic editions of a collection into hadith records"""
+    hadiths = []
+    eng_hadiths = eng_data.get('hadiths', [])
+    ara_hadiths = ara_data.get('hadiths', []) if ara_data else []
+
+    # Create Arabic lookup by hadith number
+    ara_lookup = {}
+    for h in ara_hadiths:
+        ara_lookup[h.get('hadithnumber', h.get('arabicnumber', 0))] = h.get('text', '')
+
+    # Get section info for chapter mapping
+    sections = eng_data.get('metadata', {}).get('sections', {})
+
+    for h in eng_hadiths:
+        hadith_num = h.get('hadithnumber', 0)
+        arabic_num = h.get('arabicnumber', hadith_num)
+        text_english = h.get('text', '')
+        text_arabic = ara_lookup.get(hadith_num, ara_lookup.get(arabic_num, ''))
+
+        # Extract narrator from text (usually in first sentence)
+        narrator = "Unknown"
+        if text_english:
+            # Common patterns: "Narrated X:", "X reported:", etc.
+            if "Narrated " in text_english:
+                try:
+                    narrator = "Narrated " + text_english.split("Narrated ")[1].split(":")[0]
+                except:
+                    pass
+            elif " reported" in text_english:
+                try:
+                    narrator = text_english.split(" reported")[0].split(".")[-1].strip()
+                    if narrator:
+                        narrator = narrator + " reported"
+                except:
+                    pass
+
+        # Get chapter/section from reference
+        ref = h.get('reference', {})
+        chapter_id = ref.get('book', 1) if isinstance(ref, dict) else 1
+
+        # Determine grade (default to Sahih for Bukhari/Muslim)
+        grade = "Sahih"
+        grades = h.get('grades', [])
+        if grades:
+            grade = grades[0].get('grade', 'Sahih')
+        elif collection['book_id'] > 2:  # Non Bukhari/Muslim
+            grade = "Hasan"  # Default for others
+
+        hadiths.append({
+            "id": first_id + len(hadiths),
+            "book_id": collection['book_id'],
+            "chapter_id": chapter_id,
+            "number_in_book": hadith_num,
+            "number_in_chapter": ref.get('hadith', hadith_num) if isinstance(ref, dict) else hadith_num,
+            "text_arabic": text_arabic,
+            "text_english": text_english,
+            "narrator": narrator,
+            "grade": grade,
+            "reference": f"{collection['key']}:{hadith_num}"
+        })
+
+    return hadiths
 
 def download_full_hadith_data():
-    """Download complete hadith collections"""
+    """
+    Download complete hadith collections.
+
+    All twelve editions are streamed into the HTTP cache on a bounded
+    thread pool (unchanged editions are answered by a 304).  A
+    collection is parsed and merged as soon as both of its editions have
+    arrived; collections are then saved in HADITH_COLLECTIONS order so the
+    global hadith ids stay stable.
+    """
     print("\n" + "="*60)
     print("DOWNLOADING FULL HADITH DATA")
     print("="*60)
 
+    start = time.perf_counter()
     global_hadith_id = 1
     total_hadiths = 0
-
-    for collection in HADITH_COLLECTIONS:
-        print(f"\n  [{collection['book_id']}/6] Processing {collection['name']}...")
-
-        # Download English version
-        eng_url = f"{HADITH_BASE_URL}/{collection['english_key']}.json"
-        eng_data = download_json(eng_url)
-
-        # Download Arabic version
-        ara_url = f"{HADITH_BASE_URL}/{collection['arabic_key']}.json"
-        ara_data = download_json(ara_url)
-
-        if not eng_data:
-            print(f"    ERROR: Could not download English data for {collection['name']}")
-            continue
-
-        hadiths = []
-        eng_hadiths = eng_data.get('hadiths', [])
-        ara_hadiths = ara_data.get('hadiths', []) if ara_data else []
-
-        # Create Arabic lookup by hadith number
-        ara_lookup = {}
-        for h in ara_hadiths:
-            ara_lookup[h.get('hadithnumber', h.get('arabicnumber', 0))] = h.get('text', '')
-
-        # Get section info for chapter mapping
-        sections = eng_data.get('metadata', {}).get('sections', {})
-
-        for h in eng_hadiths:
-            hadith_num = h.get('hadithnumber', 0)
-            arabic_num = h.get('arabicnumber', hadith_num)
-            text_english = h.get('text', '')
-            text_arabic = ara_lookup.get(hadith_num, ara_lookup.get(arabic_num, ''))
-
-            # Extract narrator from text (usually in first sentence)
-            narrator = "Unknown"
-            if text_english:
-                # Common patterns: "Narrated X:", "X reported:", etc.
-                if "Narrated " in text_english:
-                    try:
-                        narrator = "Narrated " + text_english.split("Narrated ")[1].split(":")[0]
-                    except:
-                        pass
-                elif " reported" in text_english:
-                    try:
-                        narrator = text_english.split(" reported")[0].split(".")[-1].strip()
-                        if narrator:
-                            narrator = narrator + " reported"
-                    except:
-                        pass
-
-            # Get chapter/section from reference
-            ref = h.get('reference', {})
-            chapter_id = ref.get('book', 1) if isinstance(ref, dict) else 1
-
-            # Determine grade (default to Sahih for Bukhari/Muslim)
-            grade = "Sahih"
-            grades = h.get('grades', [])
-            if grades:
-                grade = grades[0].get('grade', 'Sahih')
-            elif collection['book_id'] > 2:  # Non Bukhari/Muslim
-                grade = "Hasan"  # Default for others
-
-            hadiths.append({
-                "id": global_hadith_id,
-                "book_id": collection['book_id'],
-                "chapter_id": chapter_id,
-                "number_in_book": hadith_num,
-                "number_in_chapter": ref.get('hadith', hadith_num) if isinstance(ref, dict) else hadith_num,
-                "text_arabic": text_arabic,
-                "text_english": text_english,
-                "narrator": narrator,
-                "grade": grade,
-                "reference": f"{collection['key']}:{hadith_num}"
-            })
-            global_hadith_id += 1
-
-        save_json(hadiths, f"hadith_{collection['key']}.json")
-        print(f"    Downloaded {len(hadiths)} hadiths from {collection['name']}")
-        total_hadiths += len(hadiths)
-
-        # Small delay between collections
-        time.sleep(1)
-
-    print(f"\n  TOTAL HADITHS: {total_hadiths}")
+    processed = {}
+    next_to_save = 0
+
+    with ThreadPoolExecutor(max_workers=HADITH_DOWNLOAD_WORKERS) as executor:
+        futures = {}
+        for index, collection in enumerate(HADITH_COLLECTIONS):
+            for half in ('english', 'arabic'):
+                edition = collection[f'{half}_key']
+                future = executor.submit(download_to_file, f"{HADITH_BASE_URL}/{edition}.json")
+                futures[future] = (index, half)
+
+        editions = {}
+        for future in as_completed(futures):
+            index, half = futures[future]
+            editions.setdefault(index, {})[half] = future.result()
+            if len(editions[index]) < 2:
+                continue
+
+            collection = HADITH_COLLECTIONS[index]
+            paths = editions.pop(index)
+            print(f"\n  [{collection['book_id']}/6] Processing {collection['name']} "
+                  f"({time.perf_counter() - start:.1f}s)...")
+            eng_data = load_edition(paths['english'])
+            ara_data = load_edition(paths['arabic'])
+            if not eng_data:
+                print(f"    ERROR: Could not download English data for {collection['name']}")
+                processed[index] = None
+            else:
+                # Ids are relative to the collection until earlier ones are saved
+                processed[index] = build_collection_hadiths(collection, eng_data, ara_data)
+            del eng_data, ara_data
+
+            # Save every collection whose predecessors are all done
+            while next_to_save in processed:
+                hadiths = processed.pop(next_to_save)
+                collection = HADITH_COLLECTIONS[next_to_save]
+                next_to_save += 1
+                if hadiths is None:
+                    continue
+                for offset, hadith in enumerate(hadiths):
+                    hadith['id'] = global_hadith_id + offset
+                global_hadith_id += len(hadiths)
+
+                # In DATA_FORMAT; generate_database streams any format row by row
+                save_json(hadiths, f"hadith_{collection['key']}.json")
+                print(f"    Downloaded {len(hadiths)} hadiths from {collection['name']}")
+                total_hadiths += len(hadiths)
+
+    print(f"\n  TOTAL HADITHS: {total_hadiths} ({time.perf_counter() - start:.1f}s)")
     return total_hadiths
 
 def generate_expanded_duas():
@@ -587,12 +650,8 @@ def regenerate_database():
     print("REGENERATING DATABASE")
     print("="*60)
 
-    # Use the existing generate_database script
-    import importlib.util
-    spec = importlib.util.spec_from_file_location("generate_database", BASE_DIR / "scripts" / "generate_database.py")
-    gen_db = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(gen_db)
-    gen_db.main()
+    import generate_database
+    generate_database.main(['--build-profile'])
 
 def main():
     print("="*60)
@@ -620,6 +679,7 @@ def main():
     print("="*60)
     print(f"\nTotal Hadiths: {total_hadiths}")
     print(f"Database copied to: {db_dst}")
+    http_cache.print_stats()
 
 if __name__ == "__main__":
     main()
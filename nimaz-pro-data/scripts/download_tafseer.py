@@ -4,18 +4,33 @@ Download tafseer data from quran.com API (v4).
 Tafseers:
   - Ibn Kathir (Abridged) English: en-tafisr-ibn-kathir
   - Ma'arif al-Qur'an English: en-tafsir-maarif-ul-quran
+
+Each surah is checkpointed into a small SQLite staging DB as soon as it is
+downloaded, so an interrupted run picks up where it stopped.  Reruns skip
+completed surahs and only retry surahs that failed or came back empty.
+Once all 114 surahs of a tafseer are complete and exported its
+checkpoints are cleared, so the next run downloads it afresh (through
+the HTTP cache) and picks up upstream corrections.  Pass --restart to
+discard the checkpoints of an unfinished run as well.
 """
 
-import json
+import argparse
 import re
+import sqlite3
+import sys
 import time
 import urllib.request
 import urllib.error
 from html.parser import HTMLParser
 from pathlib import Path
 
+from http_cache import http_cache
+from json_stream import resolve_data_path, save_data
+from staging import stage_data
+
 JSON_DIR = Path(__file__).parent.parent / "json"
 JSON_DIR.mkdir(exist_ok=True)
+CHECKPOINT_DB = JSON_DIR / "tafseer_checkpoint.db"
 
 # Surah ayah counts (1-indexed by surah number)
 SURAH_AYAH_COUNTS = [
@@ -84,11 +99,8 @@ def fetch_url(url, retries=3):
     """Fetch a URL with retries and return parsed JSON."""
     for attempt in range(retries):
         try:
-            req = urllib.request.Request(url)
-            req.add_header('User-Agent', 'NimazPro/1.0')
-            req.add_header('Accept', 'application/json')
-            with urllib.request.urlopen(req, timeout=30) as resp:
-                return json.loads(resp.read().decode('utf-8'))
+            return http_cache.get_json(
+                url, headers={'User-Agent': 'NimazPro/1.0', 'Accept': 'application/json'}, timeout=30)
         except (urllib.error.URLError, urllib.error.HTTPError, Exception) as e:
             if attempt < retries - 1:
                 wait = 2 ** (attempt + 1)
@@ -116,74 +128,204 @@ def fetch_all_pages(base_url):
     return all_tafsirs
 
 
-def download_tafseer(slug, name, output_filename):
-    """Download all ayah tafseers for a given tafseer slug using by_chapter endpoint."""
-    output_path = JSON_DIR / output_filename
+def open_checkpoints(path=CHECKPOINT_DB):
+    """Open (creating if needed) the per-surah checkpoint store."""
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS surah_progress (
+            slug TEXT NOT NULL,
+            surah INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            entries INTEGER NOT NULL,
+            error TEXT,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (slug, surah)
+        );
+        CREATE TABLE IF NOT EXISTS tafseer_ayahs (
+            slug TEXT NOT NULL,
+            surah INTEGER NOT NULL,
+            ayah INTEGER NOT NULL,
+            text TEXT NOT NULL,
+            PRIMARY KEY (slug, surah, ayah)
+        );
+    """)
+    return conn
+
+
+def completed_surahs(conn, slug):
+    """Surah numbers already downloaded with non-empty tafseer."""
+    rows = conn.execute(
+        "SELECT surah FROM surah_progress WHERE slug = ? AND status = 'complete'", (slug,))
+    return {row[0] for row in rows}
+
+
+def save_surah_checkpoint(conn, slug, surah, tafsir_map, error=None):
+    """
+    Record one surah's outcome in a single transaction.
+
+    Status is 'failed' when the download raised, 'empty' when the API
+    returned no text for any ayah, otherwise 'complete'.
+    """
+    ayah_count = SURAH_AYAH_COUNTS[surah]
+    texts = [tafsir_map.get(f"{surah}:{ayah}", "") for ayah in range(1, ayah_count + 1)]
+    if error is not None:
+        status = 'failed'
+    elif not any(texts):
+        status = 'empty'
+    else:
+        status = 'complete'
+
+    with conn:
+        if error is None:
+            conn.execute("DELETE FROM tafseer_ayahs WHERE slug = ? AND surah = ?", (slug, surah))
+            conn.executemany(
+                "INSERT INTO tafseer_ayahs (slug, surah, ayah, text) VALUES (?, ?, ?, ?)",
+                [(slug, surah, ayah, text) for ayah, text in enumerate(texts, 1)])
+        conn.execute(
+            "INSERT OR REPLACE INTO surah_progress (slug, surah, status, entries, error, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (slug, surah, status, len(tafsir_map), str(error) if error else None, time.time()))
+    return status
+
+
+def clear_checkpoints(conn, slug):
+    """Drop a tafseer's checkpoints so the next run starts from scratch."""
+    with conn:
+        conn.execute("DELETE FROM tafseer_ayahs WHERE slug = ?", (slug,))
+        conn.execute("DELETE FROM surah_progress WHERE slug = ?", (slug,))
+
+
+def export_tafseer(conn, slug, output_filename):
+    """Write the checkpointed tafseer as JSON, empty text for missing ayahs."""
+    stored = {
+        (surah, ayah): text
+        for surah, ayah, text in conn.execute(
+            "SELECT surah, ayah, text FROM tafseer_ayahs WHERE slug = ?", (slug,))
+    }
     results = []
     ayah_global_id = 0
+    for surah in range(1, 115):
+        for ayah in range(1, SURAH_AYAH_COUNTS[surah] + 1):
+            ayah_global_id += 1
+            results.append({
+                "ayah_id": ayah_global_id,
+                "surah_number": surah,
+                "ayah_number": ayah,
+                "text": stored.get((surah, ayah), "")
+            })
+
+    save_data(JSON_DIR, output_filename, results)
+    stage_data(JSON_DIR, output_filename, results)
+    return results
+
+
+def print_completeness(conn, slug, name, results):
+    """Report the share of surahs and ayahs that have tafseer text."""
+    statuses = dict(conn.execute(
+        "SELECT surah, status FROM surah_progress WHERE slug = ?", (slug,)).fetchall())
+    complete = sum(1 for status in statuses.values() if status == 'complete')
+    non_empty = sum(1 for r in results if r['text'])
+    print(f"{name} completeness: {complete}/114 surahs ({100 * complete / 114:.1f}%), "
+          f"{non_empty}/{len(results)} ayahs with text ({100 * non_empty / len(results):.1f}%)")
+
+    for label in ('failed', 'empty'):
+        surahs = sorted(surah for surah, status in statuses.items() if status == label)
+        if surahs:
+            print(f"  {label.capitalize()} surahs (retried on next run): {surahs}")
+    missing = sorted(set(range(1, 115)) - set(statuses))
+    if missing:
+        print(f"  Not yet attempted: {missing}")
+
+
+def download_tafseer(slug, name, output_filename, conn):
+    """
+    Download all ayah tafseers for a given tafseer slug using by_chapter endpoint.
+
+    Returns True if every surah has tafseer text, False if some failed or
+    came back empty (their checkpoints are kept for the next run).
+    """
+    done = completed_surahs(conn, slug)
 
     print(f"\nDownloading {name} ({slug})...", flush=True)
+    if done:
+        print(f"  Resuming: {len(done)} surahs already checkpointed", flush=True)
 
     for surah in range(1, 115):
+        if surah in done:
+            continue
         ayah_count = SURAH_AYAH_COUNTS[surah]
         base_url = f"{API_BASE}/{slug}/by_chapter/{surah}"
 
+        tafsir_map = {}
+        error = None
         try:
             tafsirs = fetch_all_pages(base_url)
 
             # Build a lookup by verse_key
-            tafsir_map = {}
             for t in tafsirs:
                 verse_key = t.get("verse_key", "")
                 tafsir_map[verse_key] = strip_html(t.get("text", ""))
 
-            for ayah in range(1, ayah_count + 1):
-                ayah_global_id += 1
-                verse_key = f"{surah}:{ayah}"
-                text = tafsir_map.get(verse_key, "")
-                results.append({
-                    "ayah_id": ayah_global_id,
-                    "surah_number": surah,
-                    "ayah_number": ayah,
-                    "text": text
-                })
-
         except Exception as e:
             print(f"  FAILED Surah {surah}: {e}", flush=True)
-            # Fill in empty entries for this surah
-            for ayah in range(1, ayah_count + 1):
-                ayah_global_id += 1
-                results.append({
-                    "ayah_id": ayah_global_id,
-                    "surah_number": surah,
-                    "ayah_number": ayah,
-                    "text": ""
-                })
-
-        print(f"  Surah {surah}/114 done ({ayah_count} ayahs, {len(tafsirs)} tafsir entries)", flush=True)
+            error = e
+
+        status = save_surah_checkpoint(conn, slug, surah, tafsir_map, error)
+        print(f"  Surah {surah}/114 {status} ({ayah_count} ayahs, {len(tafsir_map)} tafsir entries)", flush=True)
 
         # Rate limiting - be respectful to the API
         time.sleep(0.2)
 
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(results, f, ensure_ascii=False, indent=2)
-
+    results = export_tafseer(conn, slug, output_filename)
     non_empty = sum(1 for r in results if r['text'])
-    print(f"Saved {len(results)} entries ({non_empty} non-empty) to {output_path}")
-    return results
-
+    print(f"Saved {len(results)} entries ({non_empty} non-empty) to {resolve_data_path(JSON_DIR, output_filename)}")
+    print_completeness(conn, slug, name, results)
+    # Only resume partial runs; a finished export is refetched next time
+    if len(completed_surahs(conn, slug)) < 114:
+        return False
+    clear_checkpoints(conn, slug)
+    print(f"  All surahs complete, cleared {name} checkpoints")
+    return True
+
+
+def download_all_tafseers(restart=False):
+    """
+    Download every tafseer in TAFSEERS, resuming from the checkpoints unless `restart`
+
+    Returns False if any tafseer is incomplete, so the pipeline retries it.
+    """
+    if restart and CHECKPOINT_DB.exists():
+        CHECKPOINT_DB.unlink()
+        print("Discarded existing checkpoints")
+
+    conn = open_checkpoints()
+    try:
+        incomplete = [name for slug, name, filename in TAFSEERS
+                      if not download_tafseer(slug, name, filename, conn)]
+    finally:
+        conn.close()
+    if incomplete:
+        print(f"\nIncomplete: {', '.join(incomplete)} (run again to retry the missing surahs)")
+    return not incomplete
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Download tafseer data from the quran.com API (v4)")
+    parser.add_argument('--restart', action='store_true',
+                        help="discard the checkpoints and download everything again")
+    args = parser.parse_args(argv)
 
-def main():
     print("=" * 60)
     print("Nimaz Pro - Tafseer Data Downloader")
     print("Using quran.com API v4")
     print("=" * 60)
 
-    for slug, name, filename in TAFSEERS:
-        download_tafseer(slug, name, filename)
+    complete = download_all_tafseers(restart=args.restart)
 
-    print("\nDone!")
+    http_cache.print_stats()
+    print("\nDone!" if complete else "\nDone, with incomplete tafseers")
+    return 0 if complete else 1
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
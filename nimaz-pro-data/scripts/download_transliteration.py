@@ -3,10 +3,11 @@
 Download transliteration data from Al Quran Cloud API
 API: https://api.alquran.cloud/v1/quran/en.transliteration
 """
-import json
-import urllib.request
 from pathlib import Path
 
+from http_cache import http_cache
+from json_stream import save_data
+
 API_URL = "https://api.alquran.cloud/v1/quran/en.transliteration"
 OUTPUT_FILE = Path(__file__).parent.parent / "json" / "transliteration.json"
 
@@ -14,8 +15,7 @@ def download_transliteration():
     print(f"Downloading transliteration data from {API_URL}...")
 
     try:
-        with urllib.request.urlopen(API_URL) as response:
-            data = json.loads(response.read().decode())
+        data = http_cache.get_json(API_URL)
 
         if data['code'] != 200:
             print(f"Error: API returned code {data['code']}")
@@ -36,12 +36,10 @@ def download_transliteration():
 
         print(f"Downloaded transliteration for {ayah_count} ayahs")
 
-        # Save to JSON file
-        OUTPUT_FILE.parent.mkdir(exist_ok=True, parents=True)
-        with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-            json.dump(transliteration_map, f, ensure_ascii=False, indent=2)
+        # Save in the configured data format (see json_stream)
+        output_path = save_data(OUTPUT_FILE.parent, OUTPUT_FILE.name, transliteration_map)
 
-        print(f"Saved to {OUTPUT_FILE}")
+        print(f"Saved to {output_path}")
         return True
 
     except Exception as e:
@@ -50,6 +48,7 @@ def download_transliteration():
 
 if __name__ == "__main__":
     success = download_transliteration()
+    http_cache.print_stats()
     if success:
         print("\nTransliteration data downloaded successfully!")
     else:
@@ -7,37 +7,61 @@ The tajweed text contains HTML-like tags indicating pronunciation rules:
 <tajweed class="ghunnah">نّ</tajweed>
 
 API Endpoint: https://api.quran.com/api/v4/quran/verses/uthmani_tajweed
+
+Runs without prompting.  --cache picks what happens to an existing
+json/tajweed.json: use (default) reuses it, refresh always fetches,
+max-age fetches when it is older than --max-age days (which implies
+max-age).  --update-db also writes the pre-parsed segments into an
+existing database (--db, default output/nimaz_prepopulated.db).
+
+Usage:
+    python fetch_tajweed.py [--cache use|refresh|max-age] [--max-age DAYS] [--update-db] [--db PATH]
 """
 
-import json
+import argparse
 import os
 import sqlite3
-import urllib.request
-import urllib.error
 import ssl
+import sys
 import time
 from pathlib import Path
 from typing import Dict, List, Any, Optional
 
+from http_cache import http_cache
+from json_stream import load_data, resolve_data_path, save_data
+from http_fetch import KeepAliveSession, TokenBucket, fetch_concurrently, latency_summary
+from preparse_tajweed import load_cache, preparse_single, print_unknown_summary, save_cache, split_cached
+
 # Disable SSL verification (for development)
 ssl._create_default_https_context = ssl._create_unverified_context
 
 BASE_DIR = Path(__file__).parent.parent
 JSON_DIR = BASE_DIR / "json"
 DATABASE_PATH = BASE_DIR / "output" / "nimaz_prepopulated.db"
+# Segment cache shared with generate_database (see preparse_tajweed)
+TAJWEED_CACHE = JSON_DIR / "tajweed_parsed.json"
 
 # Quran.com API base URL
 QURAN_API_BASE = "https://api.quran.com/api/v4"
 
+TOTAL_PAGES = 604
+TOTAL_AYAHS = 6236
+
+# Concurrent page fetching: worker threads and overall requests per second
+FETCH_WORKERS = 8
+FETCH_RATE = 5.0
+
+# What to do with an existing json/tajweed.json: use it, always refetch,
+# or refetch when it is older than a maximum age
+CACHE_POLICIES = ('use', 'refresh', 'max-age')
+
 
 def download_json(url: str, retries: int = 3) -> Optional[Any]:
     """Download and parse JSON from URL with retries"""
     for attempt in range(retries):
         try:
             print(f"    Downloading: {url}")
-            req = urllib.request.Request(url, headers={'User-Agent': 'Mozilla/5.0'})
-            with urllib.request.urlopen(req, timeout=60) as response:
-                return json.loads(response.read().decode('utf-8'))
+            return http_cache.get_json(url, timeout=60)
         except Exception as e:
             print(f"    Attempt {attempt + 1} failed: {e}")
             if attempt < retries - 1:
@@ -45,100 +69,184 @@ def download_json(url: str, retries: int = 3) -> Optional[Any]:
     return None
 
 
-def fetch_tajweed_by_page(page: int) -> Optional[List[Dict]]:
+def fetch_tajweed_by_page(page: int, session: Optional[KeepAliveSession] = None,
+                          api_base: str = QURAN_API_BASE) -> Optional[List[Dict]]:
     """
     Fetch tajweed text for a specific Quran page.
 
     Args:
         page: Quran page number (1-604)
+        session: Optional keep-alive session to reuse connections
+        api_base: API root (overridable for a local stub server)
 
     Returns:
         List of verse data with tajweed text, or None if failed
     """
-    url = f"{QURAN_API_BASE}/quran/verses/uthmani_tajweed?page_number={page}"
-    data = download_json(url)
+    url = f"{api_base}/quran/verses/uthmani_tajweed?page_number={page}"
+    if session is None:
+        data = download_json(url)
+    else:
+        try:
+            data = session.get_json(url)
+        except Exception as e:
+            print(f"    Failed: {url}: {e}")
+            data = None
 
     if data and "verses" in data:
         return data["verses"]
     return None
 
 
-def fetch_all_tajweed_data() -> Dict[int, str]:
+def fetch_all_tajweed_data(api_base: str = QURAN_API_BASE, workers: int = FETCH_WORKERS,
+                           rate: float = FETCH_RATE, total_pages: int = TOTAL_PAGES) -> Dict[str, str]:
     """
     Fetch tajweed text for all ayahs in the Quran.
 
+    Pages are fetched on a bounded thread pool over keep-alive connections,
+    paced by a token bucket of `rate` requests per second.
+
     Returns:
-        Dictionary mapping ayah global ID to tajweed text
+        Dictionary mapping "surah:ayah" to tajweed text, in page order
     """
     print("\n" + "=" * 60)
     print("FETCHING TAJWEED DATA FROM QURAN.COM API")
     print("=" * 60)
+    print(f"\n  {total_pages} pages, {workers} workers, {rate:g} requests/sec")
+
+    session = KeepAliveSession(cache=http_cache)
+    try:
+        results = fetch_concurrently(
+            range(1, total_pages + 1),
+            lambda page: fetch_tajweed_by_page(page, session, api_base),
+            workers=workers,
+            rate_limiter=TokenBucket(rate),
+        )
+    finally:
+        session.close()
+
+    tajweed_data: Dict[str, str] = {}
+    latencies = []
+    failed_pages = []
+
+    for page, verses, latency, _ in results:
+        latencies.append(latency)
+        if not verses:
+            failed_pages.append(page)
+            continue
+        for verse in verses:
+            # verse_key format is "surah:ayah" e.g., "1:1"
+            verse_key = verse.get("verse_key", "")
+            text_uthmani_tajweed = verse.get("text_uthmani_tajweed", "")
+
+            if verse_key and text_uthmani_tajweed:
+                parts = verse_key.split(":")
+                if len(parts) == 2:
+                    # Stored by surah:ayah and mapped to ayah ids later
+                    key = f"{int(parts[0])}:{int(parts[1])}"
+                    tajweed_data[key] = text_uthmani_tajweed
+
+    print(f"\n  Page latency: {latency_summary(latencies)}")
+    slowest = sorted(zip(latencies, (r[0] for r in results)), reverse=True)[:5]
+    print("  Slowest pages: " + ", ".join(f"{page} ({latency * 1000:.0f} ms)" for latency, page in slowest))
+    if failed_pages:
+        print(f"  ERROR: Failed to fetch {len(failed_pages)} pages: {failed_pages}")
 
-    tajweed_data: Dict[int, str] = {}
-    total_pages = 604
+    print(f"\nTotal tajweed verses fetched: {len(tajweed_data)}")
+    return tajweed_data
 
-    for page in range(1, total_pages + 1):
-        print(f"\n  Page {page}/{total_pages}")
 
-        verses = fetch_tajweed_by_page(page)
+def save_tajweed_json(tajweed_data: Dict[str, str]):
+    """Save tajweed data to the json/ directory in the configured data format"""
+    filepath = save_data(JSON_DIR, "tajweed.json", tajweed_data)
 
-        if verses:
-            for verse in verses:
-                # verse_key format is "surah:ayah" e.g., "1:1"
-                verse_key = verse.get("verse_key", "")
-                text_uthmani_tajweed = verse.get("text_uthmani_tajweed", "")
+    print(f"\nSaved tajweed data to: {filepath}")
 
-                if verse_key and text_uthmani_tajweed:
-                    parts = verse_key.split(":")
-                    if len(parts) == 2:
-                        surah_num = int(parts[0])
-                        ayah_num = int(parts[1])
 
-                        # Calculate global ayah ID
-                        # This needs to match the ID calculation used in the database
-                        # For now, we'll store by surah:ayah and map later
-                        key = f"{surah_num}:{ayah_num}"
-                        tajweed_data[key] = text_uthmani_tajweed
+def tajweed_cache_action(policy: str = 'use', max_age_days: Optional[float] = None) -> Optional[str]:
+    """
+    Decide whether the cached tajweed data can be used.
 
-            print(f"    Fetched {len(verses)} verses")
-        else:
-            print(f"    ERROR: Failed to fetch page {page}")
+    Args:
+        policy: One of CACHE_POLICIES
+        max_age_days: Age limit for the 'max-age' policy
+
+    Returns:
+        Why the data has to be fetched, or None to use the cache
+    """
+    cached_file = resolve_data_path(JSON_DIR, "tajweed.json")
+    if cached_file is None:
+        return "no cached data"
+    if policy == 'refresh':
+        return "refresh requested"
+    if policy == 'max-age':
+        age_days = (time.time() - cached_file.stat().st_mtime) / 86400
+        if age_days > max_age_days:
+            return f"cached data is {age_days:.1f} days old (limit {max_age_days:g})"
+    return None
 
-        # Rate limiting - be nice to the API
-        time.sleep(0.5)
 
-    print(f"\nTotal tajweed verses fetched: {len(tajweed_data)}")
+def load_tajweed(policy: str = 'use', max_age_days: Optional[float] = None) -> Dict[str, str]:
+    """
+    Tajweed data from the json/ cache or the API, according to the cache policy.
+    A fetch missing any ayah is not saved and returns {}.
+    """
+    reason = tajweed_cache_action(policy, max_age_days)
+    if reason is None:
+        print(f"\nUsing cached tajweed data at: {resolve_data_path(JSON_DIR, 'tajweed.json')}")
+        tajweed_data = load_data(JSON_DIR, "tajweed.json")
+        print(f"Loaded {len(tajweed_data)} tajweed entries from cache")
+        return tajweed_data
+
+    print(f"\nFetching tajweed data: {reason}")
+    tajweed_data = fetch_all_tajweed_data()
+    if len(tajweed_data) < TOTAL_AYAHS:
+        print(f"ERROR: Fetched {len(tajweed_data)}/{TOTAL_AYAHS} ayahs, not saving incomplete tajweed data")
+        return {}
+    save_tajweed_json(tajweed_data)
     return tajweed_data
 
 
-def save_tajweed_json(tajweed_data: Dict[str, str]):
-    """Save tajweed data to JSON file"""
-    JSON_DIR.mkdir(parents=True, exist_ok=True)
-    filepath = JSON_DIR / "tajweed.json"
-
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(tajweed_data, f, ensure_ascii=False, indent=2)
+def parse_segments(tajweed_data: Dict[str, str], use_cache: bool = True) -> Dict[str, str]:
+    """
+    Pre-parse tajweed HTML into {"surah:ayah": segments JSON}, the form
+    generate_database stores in ayahs.text_tajweed.  Shares the segment
+    cache with generate_database, so neither re-parses the other's work.
+    """
+    tajweed_data = {key: html for key, html in tajweed_data.items() if html}
+    cache = load_cache(TAJWEED_CACHE) if use_cache else {}
+    parsed, misses = split_cached(tajweed_data, cache)
+    print(f"Tajweed segments: {len(parsed)} cached, {len(misses)} to pre-parse")
 
-    print(f"\nSaved tajweed data to: {filepath}")
+    unknown_classes = {}
+    parsed.update((key, preparse_single(html, unknown_classes)) for key, html in misses.items())
+    print_unknown_summary(unknown_classes)
+    if misses or not use_cache:
+        save_cache(TAJWEED_CACHE, tajweed_data, parsed)
+    return parsed
 
 
-def update_database(tajweed_data: Dict[str, str]):
+def update_database(tajweed_data: Dict[str, str], db_path: Path = DATABASE_PATH):
     """
-    Update the SQLite database with tajweed text.
+    Update the SQLite database with pre-parsed tajweed segments.
+
+    The segments are loaded into a temp table keyed by (surah, ayah) and
+    written with one UPDATE joined against it.
 
     Args:
-        tajweed_data: Dictionary mapping "surah:ayah" to tajweed text
+        tajweed_data: Dictionary mapping "surah:ayah" to tajweed HTML
     """
     print("\n" + "=" * 60)
     print("UPDATING DATABASE WITH TAJWEED DATA")
     print("=" * 60)
 
-    if not DATABASE_PATH.exists():
-        print(f"ERROR: Database not found at {DATABASE_PATH}")
+    if not db_path.exists():
+        print(f"ERROR: Database not found at {db_path}")
         print("Please run generate_database.py first.")
-        return
+        return False
 
-    conn = sqlite3.connect(DATABASE_PATH)
+    segments = parse_segments(tajweed_data)
+
+    conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
 
     # Check if text_tajweed column exists, add if not
@@ -150,63 +258,88 @@ def update_database(tajweed_data: Dict[str, str]):
         cursor.execute("ALTER TABLE ayahs ADD COLUMN text_tajweed TEXT")
         conn.commit()
 
-    # Update ayahs with tajweed text
-    updated_count = 0
-
-    # Get all ayahs from database
     # surah_id equals surah number in this database
     cursor.execute("""
-        SELECT id, surah_id as surah_number, number_in_surah
-        FROM ayahs
+        CREATE TEMP TABLE tajweed_update (
+            surah_id INTEGER NOT NULL,
+            number_in_surah INTEGER NOT NULL,
+            segments TEXT NOT NULL,
+            PRIMARY KEY (surah_id, number_in_surah)
+        ) WITHOUT ROWID
     """)
+    rows = []
+    for key, value in segments.items():
+        surah_num, ayah_num = key.split(":")
+        rows.append((int(surah_num), int(ayah_num), value))
+    cursor.executemany("INSERT OR REPLACE INTO tajweed_update VALUES (?, ?, ?)", rows)
+    cursor.execute("""
+        UPDATE ayahs SET text_tajweed = (
+            SELECT u.segments FROM tajweed_update u
+            WHERE u.surah_id = ayahs.surah_id AND u.number_in_surah = ayahs.number_in_surah)
+        WHERE (surah_id, number_in_surah) IN (SELECT surah_id, number_in_surah FROM tajweed_update)
+    """)
+    updated_count = cursor.rowcount
+    cursor.execute("DROP TABLE tajweed_update")
 
-    ayahs = cursor.fetchall()
-
-    for ayah_id, surah_num, ayah_num in ayahs:
-        key = f"{surah_num}:{ayah_num}"
-
-        if key in tajweed_data:
-            cursor.execute(
-                "UPDATE ayahs SET text_tajweed = ? WHERE id = ?",
-                (tajweed_data[key], ayah_id)
-            )
-            updated_count += 1
+    derived = [name for (name,) in cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('ayah_tajweed_spans', 'mushaf_pages')")]
 
     conn.commit()
     conn.close()
 
-    print(f"\nUpdated {updated_count} ayahs with tajweed text")
+    print(f"\nUpdated {updated_count} ayahs with tajweed segments")
+    if derived:
+        print(f"Note: {', '.join(derived)} still hold the old tajweed; run generate_database.py to rebuild them.")
+    return True
 
 
-def main():
+def main(argv=None):
     """Main entry point"""
+    parser = argparse.ArgumentParser(description="Fetch tajweed text from the Quran.com API without prompting")
+    parser.add_argument('--cache', choices=CACHE_POLICIES, default=None,
+                        help="use: reuse json/tajweed.json if present (default); refresh: always fetch; "
+                             "max-age: fetch if older than --max-age days")
+    parser.add_argument('--max-age', type=float, default=None, metavar='DAYS',
+                        help="age limit for the cached data (implies --cache max-age)")
+    parser.add_argument('--update-db', action='store_true',
+                        help="also write the pre-parsed segments into an existing database")
+    parser.add_argument('--db', type=Path, default=None,
+                        help=f"database for --update-db (default: {DATABASE_PATH})")
+    args = parser.parse_args(argv)
+
+    policy = args.cache or ('max-age' if args.max_age is not None else 'use')
+    if policy == 'max-age' and args.max_age is None:
+        parser.error("--cache max-age needs --max-age DAYS")
+    if policy != 'max-age' and args.max_age is not None:
+        parser.error(f"--max-age conflicts with --cache {policy}")
+    if args.max_age is not None and args.max_age < 0:
+        parser.error("--max-age cannot be negative")
+    if args.db is not None and not args.update_db:
+        parser.error("--db only applies with --update-db")
+    update_db = args.update_db
+    db_path = args.db or DATABASE_PATH
+    max_age_days = args.max_age
+
     print("=" * 60)
     print("NIMAZ PRO - TAJWEED DATA FETCH SCRIPT")
     print("=" * 60)
 
-    # Check if we already have tajweed data cached
-    cached_file = JSON_DIR / "tajweed.json"
+    tajweed_data = load_tajweed(policy, max_age_days)
+    if not tajweed_data:
+        print("ERROR: No tajweed data")
+        return 1
 
-    if cached_file.exists():
-        print(f"\nFound cached tajweed data at: {cached_file}")
-        user_input = input("Use cached data? (y/n): ").strip().lower()
-
-        if user_input == 'y':
-            with open(cached_file, 'r', encoding='utf-8') as f:
-                tajweed_data = json.load(f)
-            print(f"Loaded {len(tajweed_data)} tajweed entries from cache")
-        else:
-            tajweed_data = fetch_all_tajweed_data()
-            save_tajweed_json(tajweed_data)
-    else:
-        tajweed_data = fetch_all_tajweed_data()
-        save_tajweed_json(tajweed_data)
+    if update_db and not update_database(tajweed_data, db_path):
+        return 1
 
     print("\n" + "=" * 60)
     print("TAJWEED DATA FETCH COMPLETE!")
     print("=" * 60)
-    print("\nRun generate_database.py to regenerate the database with tajweed data.")
+    http_cache.print_stats()
+    if not update_db:
+        print("\nRun generate_database.py to regenerate the database with tajweed data.")
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -4,17 +4,57 @@ Nimaz Pro - SQLite Database Generator
 Converts JSON files to pre-populated Room database
 """
 
+import argparse
+import hashlib
 import sqlite3
+import sys
 import json
+import time
+from itertools import islice
 from pathlib import Path
-from preparse_tajweed import preparse_single
+from concurrent.futures import ProcessPoolExecutor
+from preparse_tajweed import (preparse_single, submit_preparse, collect_preparse,
+                              load_cache, split_cached, save_cache, print_unknown_summary)
+from json_stream import iter_records, load_data, resolve_data_path
+from tajweed_codec import encode_segments, pack_spans, size_report
+from arabic_normalize import normalize_arabic
+from name_search import NAME_SEARCH_FIELDS, entity_grams
+from staging import file_fingerprint, refresh_staging, stage_table, staging_path
+from text_codec import (CODECS, CORPORA, TextCompressor, codec_available, compressed_table,
+                        table_corpora, train_dictionary)
 
 JSON_DIR = Path(__file__).parent.parent / "json"
 OUTPUT_DB = Path(__file__).parent.parent / "output" / "nimaz_prepopulated.db"
 OUTPUT_DB.parent.mkdir(exist_ok=True)
-
-def create_tables(conn):
-    """Create all tables matching Room entity definitions"""
+# Parsed tajweed segments from previous runs (written by preparse_tajweed)
+TAJWEED_CACHE = JSON_DIR / "tajweed_parsed.json"
+# Input fingerprints of the last successful build (see build_manifest)
+BUILD_MANIFEST = OUTPUT_DB.with_suffix('.manifest.json')
+
+# Secondary indexes on pre-populated content tables: (name, table(columns), unique).
+# Built by create_indexes() after populate_database() so each B-tree is
+# written once from sorted input instead of being maintained per insert.
+# Indexes on user-data tables stay in create_tables() since those ship empty.
+CONTENT_INDEXES = [
+    ('index_ayahs_surah_id', 'ayahs(surah_id)', False),
+    ('index_ayahs_juz', 'ayahs(juz)', False),
+    ('index_ayahs_page', 'ayahs(page)', False),
+    ('index_translations_ayah_id', 'translations(ayah_id)', False),
+    ('index_hadiths_book_id', 'hadiths(book_id)', False),
+    ('index_hadiths_chapter_id', 'hadiths(chapter_id)', False),
+    ('index_duas_category_id', 'duas(category_id)', False),
+    ('index_islamic_events_hijri_month_hijri_day', 'islamic_events(hijri_month, hijri_day)', False),
+    ('index_tafseer_texts_ayah_id', 'tafseer_texts(ayah_id)', False),
+    ('index_tafseer_texts_tafseer_id', 'tafseer_texts(tafseer_id)', False),
+    ('index_tafseer_texts_ayah_tafseer', 'tafseer_texts(ayah_id, tafseer_id)', True),
+]
+
+def index_table(index):
+    """Table name of a CONTENT_INDEXES entry"""
+    return index[1].split('(', 1)[0]
+
+def create_tables(conn, commit=True):
+    """Create all tables matching Room entity definitions (content indexes come later)"""
     cursor = conn.cursor()
 
     # Surahs
@@ -400,9 +440,6 @@ def create_tables(conn):
             FOREIGN KEY (ayah_id) REFERENCES ayahs(id) ON DELETE CASCADE
         )
     ''')
-    cursor.execute('CREATE INDEX IF NOT EXISTS index_tafseer_texts_ayah_id ON tafseer_texts(ayah_id)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS index_tafseer_texts_tafseer_id ON tafseer_texts(tafseer_id)')
-    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS index_tafseer_texts_ayah_tafseer ON tafseer_texts(ayah_id, tafseer_id)')
 
     # Tafseer Highlights (user data)
     cursor.execute('''
@@ -542,254 +579,1416 @@ def create_tables(conn):
     ''')
     cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS index_prophet_bookmarks_prophet_id ON prophet_bookmarks(prophet_id)')
 
-    # Create indices
-    cursor.execute('CREATE INDEX IF NOT EXISTS index_ayahs_surah_id ON ayahs(surah_id)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS index_ayahs_juz ON ayahs(juz)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS index_ayahs_page ON ayahs(page)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS index_translations_ayah_id ON translations(ayah_id)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS index_hadiths_book_id ON hadiths(book_id)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS index_hadiths_chapter_id ON hadiths(chapter_id)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS index_duas_category_id ON duas(category_id)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS index_islamic_events_hijri_month_hijri_day ON islamic_events(hijri_month, hijri_day)')
-
-    conn.commit()
+    if commit:
+        conn.commit()
 
-def load_json(filename):
-    """Load JSON file"""
-    filepath = JSON_DIR / filename
-    if filepath.exists():
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return []
+def create_indexes(conn, commit=True, tables=None):
+    """
+    Build CONTENT_INDEXES on the loaded tables and report time per index
 
-def populate_database(conn):
-    """Populate database from JSON files"""
+    Args:
+        tables: Only build indexes on these tables (None = all)
+    """
     cursor = conn.cursor()
+    total = 0.0
+    indexes = [index for index in CONTENT_INDEXES
+               if tables is None or index_table(index) in tables]
+    for name, target, unique in indexes:
+        kind = 'UNIQUE INDEX' if unique else 'INDEX'
+        start = time.perf_counter()
+        cursor.execute(f'CREATE {kind} IF NOT EXISTS {name} ON {target}')
+        elapsed = time.perf_counter() - start
+        total += elapsed
+        print(f"  {name:<46}{elapsed:>8.3f}s")
+    print(f"Built {len(indexes)} indexes in {total:.3f}s")
+
+    if commit:
+        conn.commit()
 
-    # Surahs
-    surahs = load_json('surahs.json')
-    for s in surahs:
-        cursor.execute('''
-            INSERT OR REPLACE INTO surahs VALUES (?,?,?,?,?,?,?,?,?)
-        ''', (s['id'], s['number'], s['name_arabic'], s['name_english'],
-              s['name_transliteration'], s['revelation_type'], s['verses_count'],
-              s['order_revealed'], s['start_page']))
-    print(f"Inserted {len(surahs)} surahs")
-
-    # Load transliteration data
-    transliterations = load_json('transliteration.json')
-    if transliterations:
-        print(f"Loaded transliteration data for {len(transliterations)} ayahs")
+def load_json(filename):
+    """Load a whole data file in any json_stream format (used for keyed lookup tables)"""
+    return load_data(JSON_DIR, filename, default=[])
+
+# ── Row builders ──────────────────────────────────────────────────────
+# Each builder turns one JSON record into the positional tuple expected
+# by its table's INSERT statement in CONTENT_TABLES.
+
+def surah_row(s):
+    return (s['id'], s['number'], s['name_arabic'], s['name_english'],
+            s['name_transliteration'], s['revelation_type'], s['verses_count'],
+            s['order_revealed'], s['start_page'])
+
+def ayah_row(a, transliterations, tajweed_segments):
+    # Get transliteration from transliteration.json using number_global
+    # The JSON uses string keys, so convert to string
+    transliteration = transliterations.get(str(a['number_global'])) if transliterations else None
+
+    # Tajweed is pre-parsed from HTML to JSON segments (see load_tajweed_segments),
+    # keyed by "surah:ayah"
+    tajweed_key = f"{a['surah_id']}:{a['number_in_surah']}"
+    text_tajweed = tajweed_segments.get(tajweed_key) if tajweed_segments else None
+
+    return (a['id'], a['surah_id'], a['number_in_surah'], a['number_global'],
+            a['text_arabic'], a['text_uthmani'], a['juz'], a['hizb'],
+            a['page'], 1 if a.get('sajda') else 0, a.get('sajda_type'),
+            transliteration, text_tajweed)
+
+def surah_info_row(si):
+    return (si['surahNumber'], si['description'], si['themes'])
+
+def translation_row(t):
+    return (t['ayah_id'], t['translator_id'], t['text'])
+
+def hadith_book_row(b):
+    return (b['id'], b['name_english'], b['name_arabic'], b['author'],
+            b['hadith_count'], b['description'], b['icon'])
+
+def hadith_row(h):
+    return (h['id'], h['book_id'], h['chapter_id'], h['number_in_book'],
+            h['number_in_chapter'], h['text_arabic'], h['text_english'],
+            h['narrator'], h['grade'], h['reference'])
+
+def dua_category_row(c):
+    return (c['id'], c['name_english'], c['name_arabic'], c['icon'],
+            c['display_order'], c['dua_count'])
+
+def dua_row(d):
+    return (d['id'], d['category_id'], d['title_english'], d['title_arabic'],
+            d['text_arabic'], d['transliteration'], d['translation'],
+            d['source'], d.get('virtue'), d['repeat_count'],
+            d.get('audio_file'), d['display_order'])
+
+def islamic_event_row(e):
+    return (e['id'], e['name_english'], e['name_arabic'], e['hijri_month'],
+            e['hijri_day'], e['event_type'], e['description'],
+            1 if e.get('is_holiday') else 0)
+
+def tasbih_preset_row(p):
+    return (p.get('id'), p['name'], p['arabic'], p['transliteration'],
+            p['translation'], p['target_count'], 1 if p.get('is_custom') else 0,
+            p['display_order'])
+
+def tafseer_row(tafseer_id):
+    """Build a row function for one tafseer source"""
+    def row(t):
+        return (t['ayah_id'], t['surah_number'], t['ayah_number'], tafseer_id, t['text'])
+    return row
+
+def asma_ul_husna_row(a):
+    quran_refs = json.dumps(a.get('quran_references', []))
+    return (a['id'], a['number'], a['name_arabic'], a['name_transliteration'],
+            a['name_english'], a['meaning'], a['explanation'], a['benefits'],
+            quran_refs, a['usage_in_dua'], a['display_order'])
+
+def asma_un_nabi_row(a):
+    return (a['id'], a['number'], a['name_arabic'], a['name_transliteration'],
+            a['name_english'], a['meaning'], a['explanation'], a['source'],
+            a['display_order'])
+
+def prophet_row(p):
+    key_lessons = json.dumps(p.get('key_lessons', []))
+    quran_mentions = json.dumps(p.get('quran_mentions', []))
+    miracles = json.dumps(p.get('miracles', []))
+    return (p['id'], p['number'], p['name_arabic'], p['name_english'],
+            p['name_transliteration'], p['title_arabic'], p['title_english'],
+            p['story_summary'], key_lessons, quran_mentions, p['era'],
+            p['lineage'], p['years_lived'], p['place_of_preaching'],
+            miracles, p['display_order'])
+
+STAGED_TAFSEER_SQL = ("INSERT INTO tafseer_texts (ayah_id, surah_number, ayah_number, tafseer_id, text) "
+                      "SELECT ayah_id, surah_number, ayah_number, ?, text FROM {stage} ORDER BY rowid")
+
+HADITH_FILES = ['hadith_bukhari.json', 'hadith_muslim.json', 'hadith_abudawud.json',
+                'hadith_tirmidhi.json', 'hadith_nasai.json', 'hadith_ibnmajah.json']
+
+# ── Content load plan ─────────────────────────────────────────────────
+# Loaded in order (AUTOINCREMENT ids depend on it).  Each entry lists the
+# JSON files feeding the table, optional auxiliary lookup files passed to
+# the row builder (see load_table's aux_loaders), and whether an empty
+# source should print a warning.  Entries with "staged" copy from the
+# staging store instead ({stage} is the attached stage table; auxiliary
+# lookups are joined as temp.aux_<name> (key, value) tables).
+CONTENT_TABLES = [
+    {"table": "surahs", "label": "surahs", "files": ["surahs.json"],
+     "sql": "INSERT OR REPLACE INTO surahs VALUES (?,?,?,?,?,?,?,?,?)",
+     "row": surah_row},
+    {"table": "surah_info", "label": "surah info entries", "files": ["surah_info.json"],
+     "sql": "INSERT OR REPLACE INTO surah_info VALUES (?,?,?)",
+     "row": surah_info_row},
+    {"table": "translations", "label": "translations", "files": ["translations.json"],
+     "sql": "INSERT INTO translations (ayah_id, translator_id, text) VALUES (?,?,?)",
+     "staged": "INSERT INTO translations (ayah_id, translator_id, text) "
+               "SELECT ayah_id, translator_id, text FROM {stage} ORDER BY rowid",
+     "row": translation_row},
+    {"table": "hadith_books", "label": "hadith books", "files": ["hadith_books.json"],
+     "sql": "INSERT OR REPLACE INTO hadith_books VALUES (?,?,?,?,?,?,?)",
+     "row": hadith_book_row},
+    {"table": "hadiths", "label": "hadiths", "files": HADITH_FILES,
+     "sql": "INSERT OR REPLACE INTO hadiths VALUES (?,?,?,?,?,?,?,?,?,?)",
+     "staged": "INSERT OR REPLACE INTO hadiths SELECT * FROM {stage} ORDER BY rowid",
+     "row": hadith_row},
+    {"table": "dua_categories", "label": "dua categories", "files": ["dua_categories.json"],
+     "sql": "INSERT OR REPLACE INTO dua_categories VALUES (?,?,?,?,?,?)",
+     "row": dua_category_row},
+    {"table": "duas", "label": "duas", "files": ["duas.json"],
+     "sql": "INSERT OR REPLACE INTO duas VALUES (?,?,?,?,?,?,?,?,?,?,?,?)",
+     "row": dua_row},
+    {"table": "islamic_events", "label": "events", "files": ["islamic_events.json"],
+     "sql": "INSERT OR REPLACE INTO islamic_events VALUES (?,?,?,?,?,?,?,?)",
+     "row": islamic_event_row},
+    {"table": "tasbih_presets", "label": "tasbih presets", "files": ["tasbih_presets.json"],
+     "sql": "INSERT OR REPLACE INTO tasbih_presets VALUES (?,?,?,?,?,?,?,?)",
+     "row": tasbih_preset_row},
+    {"table": "tafseer_texts", "label": "Ibn Kathir tafseer entries",
+     "files": ["tafseer_ibn_kathir.json"], "warn_if_empty": True,
+     "sql": "INSERT INTO tafseer_texts (ayah_id, surah_number, ayah_number, tafseer_id, text) VALUES (?,?,?,?,?)",
+     "staged": STAGED_TAFSEER_SQL, "staged_params": ('ibn_kathir_en',),
+     "row": tafseer_row('ibn_kathir_en')},
+    {"table": "tafseer_texts", "label": "Ma'arif al-Qur'an tafseer entries",
+     "files": ["tafseer_maariful_quran.json"], "warn_if_empty": True,
+     "sql": "INSERT INTO tafseer_texts (ayah_id, surah_number, ayah_number, tafseer_id, text) VALUES (?,?,?,?,?)",
+     "staged": STAGED_TAFSEER_SQL, "staged_params": ('maariful_quran_en',),
+     "row": tafseer_row('maariful_quran_en')},
+    {"table": "asma_ul_husna", "label": "Asma ul Husna entries", "files": ["asma_ul_husna.json"],
+     "warn_if_empty": True,
+     "sql": "INSERT OR REPLACE INTO asma_ul_husna VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+     "row": asma_ul_husna_row},
+    {"table": "asma_un_nabi", "label": "Asma un Nabi entries", "files": ["asma_un_nabi.json"],
+     "warn_if_empty": True,
+     "sql": "INSERT OR REPLACE INTO asma_un_nabi VALUES (?,?,?,?,?,?,?,?,?)",
+     "row": asma_un_nabi_row},
+    {"table": "prophets", "label": "prophet entries", "files": ["prophets.json"],
+     "warn_if_empty": True,
+     "sql": "INSERT OR REPLACE INTO prophets VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+     "row": prophet_row},
+    # Ayahs carry explicit ids, so they can go last: this gives the tajweed
+    # pre-parse running in worker processes time to finish in the background
+    {"table": "ayahs", "label": "ayahs", "files": ["ayahs.json"],
+     "aux": ["transliteration.json", "tajweed.json"],
+     "sql": "INSERT OR REPLACE INTO ayahs VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)",
+     "staged": '''
+        INSERT OR REPLACE INTO ayahs
+        SELECT a.id, a.surah_id, a.number_in_surah, a.number_global, a.text_arabic,
+               a.text_uthmani, a.juz, a.hizb, a.page, CASE WHEN a.sajda THEN 1 ELSE 0 END,
+               a.sajda_type, t.value, j.value
+        FROM {stage} a
+        LEFT JOIN temp.aux_transliteration t ON t.key = CAST(a.number_global AS TEXT)
+        LEFT JOIN temp.aux_tajweed j ON j.key = a.surah_id || ':' || a.number_in_surah
+        ORDER BY a.rowid
+     ''',
+     "row": ayah_row},
+]
+
+# Rows per executemany() call
+DEFAULT_BATCH_SIZE = 5000
+
+def batched(rows, batch_size):
+    """Yield lists of up to batch_size items from an iterable"""
+    iterator = iter(rows)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+def bulk_insert(cursor, sql, rows, batch_size=DEFAULT_BATCH_SIZE):
+    """Feed a row iterable into executemany in chunks, returns rows inserted"""
+    count = 0
+    for batch in batched(rows, batch_size):
+        cursor.executemany(sql, batch)
+        count += len(batch)
+    return count
+
+def create_aux_tables(cursor, spec, aux_data):
+    """Expose a spec's auxiliary lookups to staged SQL as temp.aux_<name> (key, value)"""
+    for aux_file, data in zip(spec.get('aux', []), aux_data):
+        table = f"aux_{Path(aux_file).stem}"
+        cursor.execute(f"DROP TABLE IF EXISTS temp.{table}")
+        cursor.execute(f"CREATE TEMP TABLE {table} (key TEXT PRIMARY KEY, value)")
+        cursor.executemany(f"INSERT OR REPLACE INTO temp.{table} VALUES (?,?)",
+                           ((str(key), value) for key, value in (data or {}).items()))
+
+def drop_aux_tables(cursor, spec):
+    for aux_file in spec.get('aux', []):
+        cursor.execute(f"DROP TABLE IF EXISTS temp.aux_{Path(aux_file).stem}")
+
+def load_table(cursor, spec, batch_size=DEFAULT_BATCH_SIZE, aux_loaders=None, staged=frozenset()):
+    """
+    Load one CONTENT_TABLES entry.
+
+    Args:
+        aux_loaders: Optional {aux file: callable} overriding how an auxiliary
+            lookup is produced (defaults to load_json)
+        staged: Data files with a fresh table in the attached staging store;
+            those are copied with the spec's "staged" SQL instead of parsed
+
+    Returns:
+        (rows inserted, seconds spent building and inserting rows)
+    """
+    aux_loaders = aux_loaders or {}
+    aux_data = []
+    for aux_file in spec.get('aux', []):
+        data = aux_loaders.get(aux_file, lambda: load_json(aux_file))()
+        if data:
+            print(f"Loaded {len(data)} entries from {aux_file}")
+        else:
+            print(f"Warning: No {aux_file} data found")
+        aux_data.append(data)
+
+    row = spec['row']
+    total = 0
+    elapsed = 0.0
+    aux_tables = False
+    for filename in spec['files']:
+        start = time.perf_counter()
+        if 'staged' in spec and filename in staged:
+            if not aux_tables:
+                create_aux_tables(cursor, spec, aux_data)
+                aux_tables = True
+            cursor.execute(spec['staged'].format(stage=f"staging.{stage_table(filename)}"),
+                           spec.get('staged_params', ()))
+            count = cursor.rowcount
+        else:
+            # Records stream from disk straight into the insert batches
+            records = iter_records(JSON_DIR, filename)
+            count = bulk_insert(cursor, spec['sql'], (row(r, *aux_data) for r in records), batch_size)
+        elapsed += time.perf_counter() - start
+        total += count
+        if len(spec['files']) > 1:
+            print(f"  Inserted {count} {spec['label']} from {filename}")
+    if aux_tables:
+        drop_aux_tables(cursor, spec)
+
+    if total == 0 and spec.get('warn_if_empty'):
+        print(f"Warning: No {spec['label']} found")
     else:
-        print("Warning: No transliteration data found")
+        rate = total / elapsed if elapsed > 0 else 0
+        print(f"Inserted {total} {spec['label']} ({rate:,.0f} rows/sec)")
+    return total, elapsed
+
+def print_load_report(stats):
+    """Print per-table row counts and insert throughput"""
+    print("\n" + "-" * 60)
+    print(f"{'Table':<22}{'Rows':>10}{'Seconds':>10}{'Rows/sec':>14}")
+    print("-" * 60)
+    for table, (rows, seconds) in stats.items():
+        rate = rows / seconds if seconds > 0 else 0
+        print(f"{table:<22}{rows:>10}{seconds:>10.3f}{rate:>14,.0f}")
+    print("-" * 60)
+
+def load_tajweed_segments(executor=None, use_cache=True):
+    """
+    Pre-parse tajweed.json into {"surah:ayah": segments JSON}.
+
+    Ayahs whose raw HTML is unchanged since the last run are served from
+    TAJWEED_CACHE; only the rest are parsed.  With an executor the parse is
+    fanned out to worker processes and a zero-argument callable is returned
+    that waits for and merges the results, so the caller can keep inserting
+    other tables meanwhile.  Without one the parse runs serially and the
+    callable returns at once.  The cache is rewritten when results are merged.
+    """
+    tajweed_data = {key: html for key, html in (load_json('tajweed.json') or {}).items() if html}
+    if not tajweed_data:
+        return lambda: {}
+
+    cache = load_cache(TAJWEED_CACHE) if use_cache else {}
+    parsed, misses = split_cached(tajweed_data, cache)
+    print(f"Tajweed segments: {len(parsed)} cached, {len(misses)} to pre-parse")
+
+    unknown_classes = {}
+
+    def finish(new_segments):
+        print_unknown_summary(unknown_classes)
+        parsed.update(new_segments)
+        if misses or not use_cache:
+            save_cache(TAJWEED_CACHE, tajweed_data, parsed)
+        return parsed
+
+    if executor is None or not misses:
+        result = finish({key: preparse_single(html, unknown_classes) for key, html in misses.items()})
+        return lambda: result
+
+    futures = submit_preparse(executor, misses)
+    return lambda: finish(collect_preparse(futures, unknown_classes))
+
+def populate_database(conn, batch_size=DEFAULT_BATCH_SIZE, commit=True, tajweed_workers=None,
+                      tajweed_cache=True, tables=None, staged=frozenset()):
+    """
+    Populate database from JSON files
+
+    Args:
+        tajweed_workers: Worker processes for tajweed pre-parsing
+            (None = one per CPU, 0 = parse serially in this process)
+        tajweed_cache: Reuse segments from TAJWEED_CACHE for unchanged ayahs
+        tables: Only load these tables (None = all)
+        staged: Data files to copy from the attached staging store
+    """
+    cursor = conn.cursor()
+    specs = [spec for spec in CONTENT_TABLES if tables is None or spec['table'] in tables]
+    needs_tajweed = any('tajweed.json' in spec.get('aux', []) for spec in specs)
+
+    executor = None
+    if needs_tajweed and tajweed_workers != 0:
+        executor = ProcessPoolExecutor(max_workers=tajweed_workers)
+    try:
+        aux_loaders = {}
+        if needs_tajweed:
+            aux_loaders['tajweed.json'] = load_tajweed_segments(executor, tajweed_cache)
+
+        stats = {}
+        for spec in specs:
+            rows, seconds = load_table(cursor, spec, batch_size, aux_loaders, staged)
+            prev_rows, prev_seconds = stats.get(spec['table'], (0, 0.0))
+            stats[spec['table']] = (prev_rows + rows, prev_seconds + seconds)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    if commit:
+        conn.commit()
+    print_load_report(stats)
+    return stats
+
+# ── Binary tajweed spans ──────────────────────────────────────────────
+# Optional compact form of ayahs.text_tajweed (see tajweed_codec).  It lives
+# in a side table rather than an extra ayahs column because Room validates
+# entity tables column-for-column against the pre-packaged file.
+TAJWEED_ENCODINGS = ('json', 'binary', 'both')
+
+def encode_tajweed_spans(conn, encoding='both', batch_size=DEFAULT_BATCH_SIZE, commit=True):
+    """
+    Write ayah_tajweed_spans from the JSON segments in ayahs.text_tajweed.
+
+    With encoding='binary' the JSON column is cleared afterwards so only the
+    spans ship; 'both' keeps it for app builds that still decode JSON.
+    """
+    cursor = conn.cursor()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ayah_tajweed_spans (
+            ayah_id INTEGER NOT NULL PRIMARY KEY,
+            spans BLOB NOT NULL,
+            FOREIGN KEY (ayah_id) REFERENCES ayahs(id) ON DELETE CASCADE
+        )
+    ''')
 
-    # Load tajweed data and pre-parse it
-    tajweed_data = load_json('tajweed.json')
-    if tajweed_data:
-        print(f"Loaded tajweed data for {len(tajweed_data)} ayahs")
-        print("Pre-parsing tajweed data to JSON format...")
-    else:
-        print("Warning: No tajweed data found")
-
-    # Ayahs (with transliteration and tajweed)
-    ayahs = load_json('ayahs.json')
-    for a in ayahs:
-        # Get transliteration from transliteration.json using number_global
-        # The JSON uses string keys, so convert to string
-        transliteration = transliterations.get(str(a['number_global'])) if transliterations else None
-
-        # Get tajweed text using "surah:ayah" key format and pre-parse it
-        tajweed_key = f"{a['surah_id']}:{a['number_in_surah']}"
-        raw_tajweed = tajweed_data.get(tajweed_key) if tajweed_data else None
-        # Pre-parse HTML tajweed to JSON format for efficient rendering
-        text_tajweed = preparse_single(raw_tajweed) if raw_tajweed else None
-
-        cursor.execute('''
-            INSERT OR REPLACE INTO ayahs VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)
-        ''', (a['id'], a['surah_id'], a['number_in_surah'], a['number_global'],
-              a['text_arabic'], a['text_uthmani'], a['juz'], a['hizb'],
-              a['page'], 1 if a.get('sajda') else 0, a.get('sajda_type'),
-              transliteration, text_tajweed))
-    print(f"Inserted {len(ayahs)} ayahs")
+    json_sizes, binary_sizes = [], []
+
+    def span_rows():
+        rows = conn.execute(
+            "SELECT id, text_uthmani, text_tajweed FROM ayahs WHERE text_tajweed IS NOT NULL ORDER BY id")
+        for ayah_id, text_uthmani, text_tajweed in rows:
+            spans = encode_segments(json.loads(text_tajweed), text_uthmani)
+            json_sizes.append(len(text_tajweed.encode('utf-8')))
+            binary_sizes.append(len(spans))
+            yield ayah_id, spans
+
+    count = bulk_insert(cursor, "INSERT OR REPLACE INTO ayah_tajweed_spans VALUES (?,?)",
+                        span_rows(), batch_size)
+    if encoding == 'binary':
+        cursor.execute("UPDATE ayahs SET text_tajweed = NULL")
+    print(f"Encoded {count} ayahs into ayah_tajweed_spans")
+    size_report(json_sizes, binary_sizes)
+
+    if commit:
+        conn.commit()
+
+# ── Mushaf pages ──────────────────────────────────────────────────────
+# One denormalized row per mushaf page (1-604) so the reader opens a page
+# with a single primary-key lookup instead of gathering its ayahs, surah
+# starts, juz/hizb changes and tajweed by ayahs.page at runtime.
+#   surah_starts  JSON [surah ids whose first ayah is on the page]
+#   markers       JSON [{"ayah_id", "juz"|"hizb"}] where a juz/hizb begins
+#   tajweed       JSON [segments of each ayah, in ayah order], when
+#                 ayahs.text_tajweed is kept
+#   tajweed_spans tajweed_codec.pack_spans() of the ayahs' binary spans,
+#                 when ayah_tajweed_spans was built
+# Only built with --mushaf-pages; the app still reads pages from ayahs.
+def build_mushaf_pages(conn, commit=True):
+    """Rebuild mushaf_pages from ayahs and report per-page payload sizes"""
+    cursor = conn.cursor()
+    cursor.execute('DROP TABLE IF EXISTS mushaf_pages')
+    cursor.execute('''
+        CREATE TABLE mushaf_pages (
+            page INTEGER NOT NULL PRIMARY KEY,
+            first_ayah_id INTEGER NOT NULL,
+            last_ayah_id INTEGER NOT NULL,
+            first_surah_id INTEGER NOT NULL,
+            last_surah_id INTEGER NOT NULL,
+            surah_starts TEXT NOT NULL,
+            juz INTEGER NOT NULL,
+            hizb INTEGER NOT NULL,
+            markers TEXT NOT NULL,
+            tajweed TEXT,
+            tajweed_spans BLOB
+        )
+    ''')
+    has_spans = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ayah_tajweed_spans'").fetchone()
+    spans_column = "s.spans" if has_spans else "NULL"
+    spans_join = "LEFT JOIN ayah_tajweed_spans s ON s.ayah_id = a.id" if has_spans else ""
+    rows = conn.execute(f'''
+        SELECT a.id, a.page, a.surah_id, a.number_in_surah, a.juz, a.hizb, a.text_tajweed, {spans_column}
+        FROM ayahs a {spans_join}
+        ORDER BY a.id
+    ''')
 
-    # Surah Info
-    surah_info = load_json('surah_info.json')
-    if surah_info:
-        for si in surah_info:
-            cursor.execute('''
-                INSERT OR REPLACE INTO surah_info VALUES (?,?,?)
-            ''', (si['surahNumber'], si['description'], si['themes']))
-        print(f"Inserted {len(surah_info)} surah info entries")
+    pages = []
+    page = None
+    prev_juz = prev_hizb = None
+    for ayah_id, page_number, surah_id, number_in_surah, juz, hizb, text_tajweed, spans in rows:
+        if page is None or page['page'] != page_number:
+            page = {'page': page_number, 'first': ayah_id, 'first_surah': surah_id,
+                    'juz': juz, 'hizb': hizb, 'starts': [], 'markers': [], 'tajweed': [], 'spans': []}
+            pages.append(page)
+        page['last'] = ayah_id
+        page['last_surah'] = surah_id
+        if number_in_surah == 1:
+            page['starts'].append(surah_id)
+        if juz != prev_juz:
+            page['markers'].append({"ayah_id": ayah_id, "juz": juz})
+        if hizb != prev_hizb:
+            page['markers'].append({"ayah_id": ayah_id, "hizb": hizb})
+        prev_juz, prev_hizb = juz, hizb
+        page['tajweed'].append(text_tajweed)
+        page['spans'].append(spans)
+
+    def page_rows():
+        for p in pages:
+            tajweed = None
+            if any(t is not None for t in p['tajweed']):
+                tajweed = '[' + ','.join(t or '[]' for t in p['tajweed']) + ']'
+            tajweed_spans = None
+            if any(s is not None for s in p['spans']):
+                tajweed_spans = pack_spans(s or b'' for s in p['spans'])
+            yield (p['page'], p['first'], p['last'], p['first_surah'], p['last_surah'],
+                   json.dumps(p['starts']), p['juz'], p['hizb'], json.dumps(p['markers']),
+                   tajweed, tajweed_spans)
+
+    count = bulk_insert(cursor, "INSERT INTO mushaf_pages VALUES (?,?,?,?,?,?,?,?,?,?,?)", page_rows())
+    print(f"Built {count} mushaf pages")
+    print_page_sizes(conn)
+
+    if commit:
+        conn.commit()
+
+def print_page_sizes(conn):
+    """Per-page payload size summary for mushaf_pages"""
+    sizes = conn.execute('''
+        SELECT page, LENGTH(CAST(COALESCE(tajweed, '') AS BLOB)), LENGTH(COALESCE(tajweed_spans, X''))
+        FROM mushaf_pages ORDER BY page
+    ''').fetchall()
+    if not sizes:
+        return
+    for label, column in (("tajweed JSON", 1), ("tajweed spans", 2)):
+        values = sorted(row[column] for row in sizes)
+        if not values[-1]:
+            continue
+        largest = sorted(sizes, key=lambda row: row[column], reverse=True)[:3]
+        print(f"  {label:<14} total {sum(values) / 1024:>8,.1f} KB, per page min {values[0]:,} B, "
+              f"median {values[len(values) // 2]:,} B, max {values[-1]:,} B "
+              f"(largest: {', '.join(f'p{row[0]}' for row in largest)})")
+
+# ── Normalized Arabic search text ─────────────────────────────────────
+# Diacritic-free search forms of the vocalized Arabic columns (see
+# arabic_normalize), computed once here so the app only has to normalize
+# the query.  Side tables keyed by the content row id, since Room validates
+# entity tables column-for-column.  `text` is indexed, so equality and
+# prefix lookups with the normalized query are index range scans:
+#     SELECT id FROM ayah_search WHERE text >= :q AND text < :q || char(65535)
+# (e.g. finding an ayah by its opening words).  Word and substring search
+# goes through the FTS indexes --fts builds over these tables.  Only built
+# with --search-tables (or --fts); the app does not query them yet.
+# (search table, content table, source columns)
+SEARCH_TABLES = [
+    ('ayah_search', 'ayahs', ['text_uthmani', 'text_arabic']),
+    ('hadith_search', 'hadiths', ['text_arabic']),
+]
+# Search tables are rebuilt whenever their content table is
+SEARCH_SOURCES = {search: content for search, content, _ in SEARCH_TABLES}
+
+def create_search_index(conn, search):
+    """Index a search table's normalized text for equality/prefix lookups"""
+    conn.execute(f'CREATE INDEX IF NOT EXISTS index_{search}_text ON {search}(text)')
+
+def build_search_tables(conn, batch_size=DEFAULT_BATCH_SIZE, commit=True, tables=None):
+    """
+    Fill SEARCH_TABLES from their content tables
+
+    Source columns that normalize to the same string are stored once,
+    otherwise the distinct forms are joined with a newline.
+
+    Args:
+        tables: Only rebuild search tables over these content tables (None = all)
+    """
+    cursor = conn.cursor()
+    for search, content, columns in SEARCH_TABLES:
+        if tables is not None and content not in tables:
+            continue
+        start = time.perf_counter()
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {search} (
+                id INTEGER NOT NULL PRIMARY KEY,
+                text TEXT NOT NULL,
+                FOREIGN KEY (id) REFERENCES {content}(id) ON DELETE CASCADE
+            )
+        ''')
+        cursor.execute(f'DELETE FROM {search}')
+
+        def search_rows():
+            for row in conn.execute(f"SELECT id, {', '.join(columns)} FROM {content} ORDER BY id"):
+                forms = dict.fromkeys(normalize_arabic(value) for value in row[1:] if value)
+                yield row[0], '\n'.join(form for form in forms if form)
+
+        count = bulk_insert(cursor, f"INSERT INTO {search} VALUES (?,?)", search_rows(), batch_size)
+        create_search_index(conn, search)
+        print(f"  {search:<22}{count:>8} rows{time.perf_counter() - start:>10.3f}s")
+
+    if commit:
+        conn.commit()
+
+# ── Name trigrams ─────────────────────────────────────────────────────
+# Shared trigram -> entity id lookup over the names tables for as-you-type
+# search (see name_search for the gram rules and the query side).  Only
+# built with --name-trigrams.
+def build_name_trigrams(conn, batch_size=DEFAULT_BATCH_SIZE, commit=True, tables=None):
+    """
+    Fill name_trigrams for the NAME_SEARCH_FIELDS tables
+
+    Args:
+        tables: Only refresh grams of these tables (None = all)
+    """
+    cursor = conn.cursor()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS name_trigrams (
+            gram TEXT NOT NULL,
+            entity TEXT NOT NULL,
+            entity_id INTEGER NOT NULL,
+            PRIMARY KEY (gram, entity, entity_id)
+        ) WITHOUT ROWID
+    ''')
+    for table in NAME_SEARCH_FIELDS:
+        if tables is not None and table not in tables:
+            continue
+        start = time.perf_counter()
+        cursor.execute("DELETE FROM name_trigrams WHERE entity = ?", (table,))
+        count = bulk_insert(cursor, "INSERT INTO name_trigrams VALUES (?,?,?)",
+                            entity_grams(conn, table), batch_size)
+        print(f"  {table:<22}{count:>8} grams{time.perf_counter() - start:>9.3f}s")
+
+    if commit:
+        conn.commit()
+
+# ── Compressed long text ──────────────────────────────────────────────
+# Optional: tafseer and hadith prose moved into <table>_compressed side
+# tables as per-row BLOBs compressed with a dictionary trained per corpus
+# (see text_codec).  The TEXT columns are emptied, so this runs after the
+# search tables are derived from them.
+def compress_long_text(conn, codec, batch_size=DEFAULT_BATCH_SIZE, commit=True, tables=None):
+    """
+    Train a dictionary per CORPORA entry and fill the compressed side tables
+
+    Args:
+        tables: Only recompress these content tables (None = all)
+    """
+    cursor = conn.cursor()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS text_dictionaries (
+            corpus TEXT NOT NULL PRIMARY KEY,
+            codec TEXT NOT NULL,
+            dictionary BLOB NOT NULL
+        )
+    ''')
+    for table in dict.fromkeys(table for table, _ in CORPORA.values()):
+        if tables is not None and table not in tables:
+            continue
+        start = time.perf_counter()
+        corpora = table_corpora(table)
+        columns = [CORPORA[corpus][1] for corpus in corpora]
+        side_table = compressed_table(table)
+        cursor.execute(f"DROP TABLE IF EXISTS {side_table}")
+        cursor.execute(f"CREATE TABLE {side_table} (id INTEGER NOT NULL PRIMARY KEY, "
+                       f"{', '.join(f'{column} BLOB' for column in columns)})")
+
+        compressors = {}
+        for corpus, column in zip(corpora, columns):
+            texts = [text for (text,) in conn.execute(f"SELECT {column} FROM {table} ORDER BY id")]
+            dictionary = train_dictionary(texts, codec)
+            cursor.execute("INSERT OR REPLACE INTO text_dictionaries VALUES (?,?,?)",
+                           (corpus, codec, dictionary))
+            compressors[column] = TextCompressor(codec, dictionary)
+
+        raw_bytes = {column: 0 for column in columns}
+        stored_bytes = {column: 0 for column in columns}
+
+        def compressed_rows():
+            for row in conn.execute(f"SELECT id, {', '.join(columns)} FROM {table} ORDER BY id"):
+                values = [row[0]]
+                for column, text in zip(columns, row[1:]):
+                    blob = compressors[column].compress(text) if text else None
+                    raw_bytes[column] += len(text.encode('utf-8')) if text else 0
+                    stored_bytes[column] += len(blob) if blob else 0
+                    values.append(blob)
+                yield values
+
+        count = bulk_insert(cursor, f"INSERT INTO {side_table} VALUES ({', '.join('?' * (len(columns) + 1))})",
+                            compressed_rows(), batch_size)
+        # Room declares these NOT NULL, so they are emptied rather than nulled
+        cursor.execute(f"UPDATE {table} SET " + ', '.join(f"{column} = ''" for column in columns))
+        print(f"  {side_table:<26}{count:>8} rows{time.perf_counter() - start:>9.3f}s")
+        for corpus, column in zip(corpora, columns):
+            raw, stored = raw_bytes[column], stored_bytes[column]
+            if raw:
+                print(f"    {corpus:<24}{raw / 1024 / 1024:>8.2f} MB -> {stored / 1024 / 1024:.2f} MB "
+                      f"({100 * (1 - stored / raw):.1f}% saved, {codec})")
+
+    if commit:
+        conn.commit()
+
+# ── Full-text search ──────────────────────────────────────────────────
+# Optional external-content FTS5 indexes over the corpora the DAOs search
+# with LIKE '%query%'.  The FTS tables store only the index (text stays in
+# the content table) and are joined back by rowid = id.  Combining marks
+# are token characters so vocalized Arabic words are not split at every
+# haraka.  Triggers keep each index in step with later writes to its
+# content table; the build itself fills them with a single 'rebuild'.
+# (fts table, content table, indexed columns)
+FTS_TABLES = [
+    ('ayahs_fts', 'ayahs', ['text_uthmani', 'text_arabic']),
+    ('translations_fts', 'translations', ['text']),
+    ('hadiths_fts', 'hadiths', ['text_english', 'text_arabic']),
+    ('tafseer_texts_fts', 'tafseer_texts', ['text']),
+    ('ayah_search_fts', 'ayah_search', ['text']),
+    ('hadith_search_fts', 'hadith_search', ['text']),
+]
+FTS_TOKENIZE = "unicode61 remove_diacritics 2 categories 'L* N* Co M*'"
+
+def fts_selected(content, tables):
+    """Whether an FTS index over `content` is affected by reloading `tables`"""
+    return tables is None or SEARCH_SOURCES.get(content, content) in tables
+
+def drop_fts(conn, tables=None):
+    """Drop the FTS index and triggers for the given content tables (None = all)"""
+    for fts, content, _ in FTS_TABLES:
+        if fts_selected(content, tables):
+            for suffix in ('ai', 'ad', 'au'):
+                conn.execute(f'DROP TRIGGER IF EXISTS {fts}_{suffix}')
+            conn.execute(f'DROP TABLE IF EXISTS {fts}')
+
+def build_fts(conn, commit=True, tables=None):
+    """
+    Create and fill the FTS_TABLES indexes with their sync triggers
+
+    Args:
+        tables: Only (re)build indexes over these content tables (None = all)
+    """
+    cursor = conn.cursor()
+    drop_fts(conn, tables)
+    for fts, content, columns in FTS_TABLES:
+        if not fts_selected(content, tables):
+            continue
+        cols = ', '.join(columns)
+        new_cols = ', '.join(f'new.{c}' for c in columns)
+        old_cols = ', '.join(f'old.{c}' for c in columns)
+
+        start = time.perf_counter()
+        cursor.execute(f'''
+            CREATE VIRTUAL TABLE {fts} USING fts5(
+                {cols}, content='{content}', content_rowid='id',
+                tokenize="{FTS_TOKENIZE}"
+            )
+        ''')
+        cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+        cursor.execute(f'''
+            CREATE TRIGGER {fts}_ai AFTER INSERT ON {content} BEGIN
+                INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols});
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER {fts}_ad AFTER DELETE ON {content} BEGIN
+                INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols});
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER {fts}_au AFTER UPDATE ON {content} BEGIN
+                INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols});
+                INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols});
+            END
+        ''')
+        rows = cursor.execute(f'SELECT COUNT(*) FROM {content}').fetchone()[0]
+        print(f"  {fts:<22}{rows:>8} rows{time.perf_counter() - start:>10.3f}s")
+
+    if commit:
+        conn.commit()
+
+# ── Build profile ─────────────────────────────────────────────────────
+# The output file is scratch until the build succeeds (it is deleted and
+# regenerated every run), so durability is traded for write speed.  An
+# in-memory journal is kept rather than OFF so a failed load can still
+# roll back cleanly; for a fresh file it journals almost nothing.
+BUILD_PRAGMAS = [
+    "PRAGMA journal_mode = MEMORY",
+    "PRAGMA synchronous = OFF",
+    "PRAGMA cache_size = -262144",  # 256 MiB
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA locking_mode = EXCLUSIVE",
+]
+
+# Settings restored before the file is shipped.  Room opens the asset copy
+# itself, so the file must carry a rollback journal header and no lock.
+ROOM_PRAGMAS = [
+    "PRAGMA journal_mode = DELETE",
+    "PRAGMA synchronous = FULL",
+    "PRAGMA locking_mode = NORMAL",
+]
+
+def apply_build_profile(conn):
+    """Switch the connection to fast, non-durable bulk load settings"""
+    for pragma in BUILD_PRAGMAS:
+        conn.execute(pragma)
+
+def finalize_build_profile(conn):
+    """Verify the finished database and restore Room-compatible settings"""
+    result = conn.execute("PRAGMA integrity_check").fetchone()[0]
+    if result != 'ok':
+        raise RuntimeError(f"Integrity check failed: {result}")
+    print("Integrity check: ok")
+
+    for pragma in ROOM_PRAGMAS:
+        conn.execute(pragma)
+    # locking_mode = NORMAL only releases the exclusive lock on the next access
+    conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+
+# ── Incremental rebuild ───────────────────────────────────────────────
+# The manifest written next to the database records a content hash for
+# every input file and the tables each one feeds, plus the SHA-1 of the
+# database file itself.  On the next run only tables whose inputs changed
+# are cleared and reloaded in place.  Any change to the generator scripts
+# or output options, or a database that is not the one the manifest was
+# written for, forces a full rebuild.
+MANIFEST_VERSION = 1
+GENERATOR_SOURCES = ['generate_database.py', 'preparse_tajweed.py', 'tajweed_codec.py', 'json_stream.py',
+                     'arabic_normalize.py', 'name_search.py', 'text_codec.py',
+                     'staging.py']
+
+def table_inputs():
+    """{table: [input files]} from CONTENT_TABLES, including auxiliary lookups"""
+    inputs = {}
+    for spec in CONTENT_TABLES:
+        files = inputs.setdefault(spec['table'], [])
+        for filename in spec['files'] + spec.get('aux', []):
+            if filename not in files:
+                files.append(filename)
+    return inputs
+
+def build_manifest(options):
+    """Fingerprint the current inputs, generator sources and output options"""
+    inputs = table_inputs()
+    filenames = sorted({f for files in inputs.values() for f in files})
+    scripts_dir = Path(__file__).parent
+    generator = hashlib.sha1()
+    for source in GENERATOR_SOURCES:
+        generator.update((file_fingerprint(scripts_dir / source) or '').encode())
+    return {
+        "version": MANIFEST_VERSION,
+        "generator": generator.hexdigest(),
+        "options": options,
+        "files": {f: file_fingerprint(resolve_data_path(JSON_DIR, f)) for f in filenames},
+        "tables": inputs,
+    }
+
+def load_manifest(path):
+    if not path.exists():
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_manifest(manifest, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+def plan_rebuild(previous, current, db_path=None):
+    """
+    Decide what to rebuild.
+
+    Args:
+        db_path: Database `previous` describes (default OUTPUT_DB)
+
+    Returns:
+        None for a full rebuild, otherwise the set of tables whose inputs
+        changed (empty when the database is up to date)
+    """
+    db_path = db_path or OUTPUT_DB
+    if previous is None or not db_path.exists():
+        return None
+    # The manifest only describes the file it was written for; anything
+    # else (another script, a manual edit) gets a full rebuild
+    if previous.get('database') != file_fingerprint(db_path):
+        print(f"{db_path.name} does not match its build manifest")
+        return None
+    for key in ('version', 'generator', 'options', 'tables'):
+        if previous.get(key) != current[key]:
+            print(f"Build manifest {key} changed")
+            return None
+
+    changed_files = {f for f, digest in current['files'].items()
+                     if previous.get('files', {}).get(f) != digest}
+    for filename in sorted(changed_files):
+        print(f"  Changed: {filename}")
+    return {table for table, files in current['tables'].items()
+            if changed_files.intersection(files)}
+
+def clear_tables(conn, tables):
+    """Empty tables for reloading and drop their content and FTS indexes"""
+    cursor = conn.cursor()
+    for index in CONTENT_INDEXES:
+        if index_table(index) in tables:
+            cursor.execute(f'DROP INDEX IF EXISTS {index[0]}')
+    # Before the DELETEs so the FTS sync triggers do not fire per row
+    drop_fts(conn, tables)
+    for table in sorted(tables):
+        cursor.execute(f'DELETE FROM {table}')
+        # Restart AUTOINCREMENT ids so reloaded rows match a full build
+        cursor.execute('DELETE FROM sqlite_sequence WHERE name = ?', (table,))
+    if 'ayahs' in tables:
+        cursor.execute('DROP TABLE IF EXISTS ayah_tajweed_spans')
+
+# ── Copy from a previous build ────────────────────────────────────────
+# --from-db PREV builds a fresh database but copies every table whose
+# inputs are unchanged since PREV was built (per PREV's manifest) from the
+# attached file with INSERT ... SELECT, together with the side tables
+# derived from it; only tables with changed inputs are parsed from JSON.
+# Each copy is checked against its source by row count and checksum, and
+# content tables also against the checksums PREV's manifest recorded.
+
+# Side tables derived from a single content table, copied along with it
+DERIVED_TABLES = {
+    'ayahs': ['ayah_tajweed_spans', 'mushaf_pages', 'ayah_search'],
+    'hadiths': ['hadith_search', 'hadiths_compressed'],
+    'tafseer_texts': ['tafseer_texts_compressed'],
+}
+# Side tables shared by several content tables:
+# (table, key column, content table a key belongs to)
+SHARED_TABLES = [
+    ('name_trigrams', 'entity', lambda key: key),
+    ('text_dictionaries', 'corpus', lambda key: CORPORA[key][0]),
+]
+
+def table_checksum(conn, table, schema='main', where='', params=()):
+    """(row count, SHA-1 of the rows in key order) of a table"""
+    sql = conn.execute(f"SELECT sql FROM {schema}.sqlite_master WHERE type = 'table' AND name = ?",
+                       (table,)).fetchone()[0]
+    # WITHOUT ROWID tables scan in primary key order already
+    order = '' if 'WITHOUT ROWID' in sql.upper() else ' ORDER BY rowid'
+    digest = hashlib.sha1()
+    count = 0
+    for row in conn.execute(f"SELECT * FROM {schema}.{table} {where}{order}", params):
+        digest.update(repr(row).encode('utf-8'))
+        count += 1
+    return count, digest.hexdigest()
+
+def content_checksums(conn):
+    """{content table: [rows, checksum]} recorded in the build manifest"""
+    return {table: list(table_checksum(conn, table))
+            for table in dict.fromkeys(spec['table'] for spec in CONTENT_TABLES)}
+
+def copy_previous_tables(conn, tables, recorded=None):
+    """
+    Copy content tables and their side tables from the database attached
+    as `previous`, verifying every copy.
+
+    Args:
+        tables: Content tables to copy
+        recorded: Checksums from the previous build's manifest, if any
+
+    Raises:
+        RuntimeError: A copy or the previous database does not verify
+    """
+    cursor = conn.cursor()
+    previous_schema = dict(conn.execute("SELECT name, sql FROM previous.sqlite_master WHERE type = 'table'"))
+    copies = []
+    for table in sorted(tables):
+        copies.append((table, '', ()))
+        copies += [(side, '', ()) for side in DERIVED_TABLES.get(table, []) if side in previous_schema]
+    for shared, column, owner in SHARED_TABLES:
+        if shared not in previous_schema:
+            continue
+        keys = [key for key, in conn.execute(f"SELECT DISTINCT {column} FROM previous.{shared}")
+                if owner(key) in tables]
+        if keys:
+            copies.append((shared, f"WHERE {column} IN ({', '.join('?' * len(keys))})", tuple(keys)))
+
+    existing = {name for name, in conn.execute("SELECT name FROM main.sqlite_master WHERE type = 'table'")}
+    for name, where, params in copies:
+        start = time.perf_counter()
+        if name not in existing:
+            cursor.execute(previous_schema[name])
+            existing.add(name)
+        order = '' if 'WITHOUT ROWID' in previous_schema[name].upper() else ' ORDER BY rowid'
+        cursor.execute(f"INSERT INTO main.{name} SELECT * FROM previous.{name} {where}{order}", params)
+        if 'AUTOINCREMENT' in previous_schema[name].upper():
+            # The insert leaves a counter row even for an empty table; keep
+            # the previous database's row (or none) as a full build would
+            cursor.execute("DELETE FROM main.sqlite_sequence WHERE name = ?", (name,))
+            cursor.execute("INSERT INTO main.sqlite_sequence SELECT * FROM previous.sqlite_sequence WHERE name = ?",
+                           (name,))
+
+        source = table_checksum(conn, name, 'previous', where, params)
+        if recorded and name in recorded and tuple(recorded[name]) != source:
+            raise RuntimeError(f"{name} in the previous database does not match its manifest checksum")
+        if table_checksum(conn, name, 'main', where, params) != source:
+            raise RuntimeError(f"Copy of {name} does not match the previous database")
+        if name in SEARCH_SOURCES:
+            create_search_index(conn, name)
+        print(f"  {name:<26}{source[0]:>8} rows{time.perf_counter() - start:>9.3f}s  sha1 {source[1][:12]}")
+
+# ── Compaction and size budget ────────────────────────────────────────
+# The database ships inside the APK, so after the build it is analyzed
+# (sqlite_stat1 ships with it for the app's query planner), rewritten
+# with VACUUM at the chosen page size, and its layout is reported per
+# table and index from dbstat.  A size budget turns growth into a build
+# failure instead of a surprise in the release APK.
+PAGE_SIZE_CANDIDATES = [1024, 2048, 4096, 8192, 16384]
+# Android's SQLite default; kept unless another size saves over 1%
+DEFAULT_PAGE_SIZE = 4096
+# Sizes the auto trial considers.  Pages below 4096 save a little space
+# but cost extra page reads per row and index lookup on the device, so
+# they are only used when asked for explicitly with --page-size.
+AUTO_PAGE_SIZES = [size for size in PAGE_SIZE_CANDIDATES if size >= DEFAULT_PAGE_SIZE]
+# Fail the build above this many MB (None = no budget)
+SIZE_BUDGET_MB = None
+
+def choose_page_size(conn, db_path):
+    """Trial VACUUM INTO each AUTO_PAGE_SIZES page size, return the smallest result"""
+    sizes = {}
+    trial_path = db_path.with_suffix('.pagesize.tmp')
+    for page_size in AUTO_PAGE_SIZES:
+        if trial_path.exists():
+            trial_path.unlink()
+        conn.execute(f"PRAGMA page_size = {page_size}")
+        conn.execute("VACUUM INTO ?", (str(trial_path),))
+        sizes[page_size] = trial_path.stat().st_size
+        print(f"  page_size {page_size:>6}: {sizes[page_size] / 1024 / 1024:8.2f} MB")
+    if trial_path.exists():
+        trial_path.unlink()
+
+    best = min(sizes, key=sizes.get)
+    if sizes[best] > sizes[DEFAULT_PAGE_SIZE] * 0.99:
+        best = DEFAULT_PAGE_SIZE
+    return best
+
+def compact_database(conn, db_path, page_size='auto'):
+    """ANALYZE, then VACUUM at the given (or best trial) page size"""
+    start = time.perf_counter()
+    conn.execute("ANALYZE")
+    if page_size == 'auto':
+        page_size = choose_page_size(conn, db_path)
+    conn.execute(f"PRAGMA page_size = {int(page_size)}")
+    conn.execute("VACUUM")
+    print(f"Compacted with page_size {page_size} in {time.perf_counter() - start:.2f}s")
+    return page_size
+
+# FTS5 stores each index in these shadow tables
+FTS_SHADOW_SUFFIXES = ('_data', '_idx', '_docsize', '_config', '_content')
+
+def size_breakdown(conn, db_path):
+    """
+    Per-object byte usage from dbstat.
+
+    Returns:
+        Report dict: file size, page stats, every table/index, and a
+        rollup of each table with its indexes (FTS shadow tables are
+        counted under their FTS table)
+    """
+    schema = {name: (kind, table) for kind, name, table in
+              conn.execute("SELECT type, name, tbl_name FROM sqlite_master")}
+    virtual = {name for name, in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND sql LIKE 'CREATE VIRTUAL TABLE%'")}
+
+    def owner(name):
+        table = schema.get(name, ('table', name))[1]
+        for suffix in FTS_SHADOW_SUFFIXES:
+            if table.endswith(suffix) and table[:-len(suffix)] in virtual:
+                return table[:-len(suffix)]
+        return table
+
+    objects = []
+    rollup = {}
+    for name, pages, size, payload, unused in conn.execute(
+            "SELECT name, COUNT(*), SUM(pgsize), SUM(payload), SUM(unused) FROM dbstat GROUP BY name"):
+        kind = schema.get(name, ('table', name))[0]
+        objects.append({"name": name, "type": kind, "table": owner(name), "pages": pages,
+                        "bytes": size, "payload_bytes": payload, "unused_bytes": unused})
+        rollup[owner(name)] = rollup.get(owner(name), 0) + size
+    objects.sort(key=lambda o: o['bytes'], reverse=True)
+
+    return {
+        "file_bytes": db_path.stat().st_size,
+        "page_size": conn.execute("PRAGMA page_size").fetchone()[0],
+        "page_count": conn.execute("PRAGMA page_count").fetchone()[0],
+        "freelist_count": conn.execute("PRAGMA freelist_count").fetchone()[0],
+        "tables": dict(sorted(rollup.items(), key=lambda item: item[1], reverse=True)),
+        "objects": objects,
+    }
+
+def write_size_report(report, path, top=12):
+    """Save the breakdown as JSON and print the largest tables"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n{'Table (with indexes)':<32}{'KB':>12}{'Share':>8}")
+    total = sum(report['tables'].values()) or 1
+    for table, size in list(report['tables'].items())[:top]:
+        print(f"{table:<32}{size / 1024:>12,.1f}{100 * size / total:>7.1f}%")
+    print(f"Size report written to {path}")
+
+def check_size_budget(db_path, budget_mb):
+    """False (after printing why) if the database file exceeds the budget"""
+    if budget_mb is None:
+        return True
+    size_mb = db_path.stat().st_size / 1024 / 1024
+    if size_mb > budget_mb:
+        print(f"\nERROR: Database is {size_mb:.2f} MB, over the {budget_mb:.2f} MB size budget")
+        return False
+    print(f"Size budget: {size_mb:.2f} / {budget_mb:.2f} MB")
+    return True
+
+# ── Core + shard split ────────────────────────────────────────────────
+# Optional split of the finished database into a small core DB and one
+# shard DB per hadith collection and per tafseer, written to SHARD_DIR.
+# The monolithic database stays the build output (incremental rebuilds
+# work from it); the split is derived from it afterwards.  The core keeps
+# every table (Room validates them) with the shard contents removed.  Each
+# shard holds its rows with the same schema, indexes, derived search rows
+# and optional FTS index, plus a shard_info table describing itself, and
+# is listed in SHARD_MANIFEST with its SHA-256 for the app to verify
+# before attaching it.
+SHARD_DIR_NAME = "shards"
+SHARD_MANIFEST = "manifest.json"
+
+# (kind, content table, grouping column, derived tables keyed by content id)
+SHARD_KINDS = [
+    ('hadith', 'hadiths', 'book_id', ['hadith_search', 'hadiths_compressed']),
+    ('tafseer', 'tafseer_texts', 'tafseer_id', ['tafseer_texts_compressed']),
+]
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def shard_groups(conn):
+    """Yield (kind, key, table, column, value, derived tables) for every shard to write"""
+    for kind, table, column, derived in SHARD_KINDS:
+        if kind == 'hadith':
+            # Collection slug from references like "bukhari:123"
+            groups = conn.execute(f'''
+                SELECT book_id, MIN(substr(reference, 1, instr(reference, ':') - 1))
+                FROM hadiths GROUP BY book_id ORDER BY book_id
+            ''').fetchall()
+            groups = [(value, slug or f"book_{value}") for value, slug in groups]
+        else:
+            groups = [(value, value) for value, in conn.execute(
+                f"SELECT DISTINCT {column} FROM {table} ORDER BY {column}")]
+        for value, key in groups:
+            yield kind, key, table, column, value, derived
+
+def write_shard(db_path, shard_path, kind, key, table, column, value, derived, fts):
+    """Copy one group's rows (and derived rows) from db_path into a new shard DB"""
+    source = sqlite3.connect(db_path)
+    schema = dict(source.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'table' AND name IN ({})".format(
+            ', '.join('?' * (1 + len(derived)))), [table] + derived).fetchall())
+    source.close()
+    # Derived tables only exist for the options the build used
+    derived = [derived_table for derived_table in derived if derived_table in schema]
+
+    conn = sqlite3.connect(shard_path)
+    conn.execute("ATTACH DATABASE ? AS src", (str(db_path),))
+    conn.execute(schema[table])
+    rows = conn.execute(f"INSERT INTO {table} SELECT * FROM src.{table} WHERE {column} = ?",
+                        (value,)).rowcount
+    for derived_table in derived:
+        conn.execute(schema[derived_table])
+        conn.execute(f'''
+            INSERT INTO {derived_table} SELECT * FROM src.{derived_table}
+            WHERE id IN (SELECT id FROM {table})
+        ''')
+    conn.commit()
+    conn.execute("DETACH DATABASE src")
+
+    for name, target, unique in CONTENT_INDEXES:
+        if index_table((name, target, unique)) == table:
+            conn.execute(f"CREATE {'UNIQUE INDEX' if unique else 'INDEX'} {name} ON {target}")
+    for derived_table in derived:
+        if derived_table in SEARCH_SOURCES:
+            create_search_index(conn, derived_table)
+    if fts:
+        build_fts(conn, commit=False, tables={table})
+    conn.execute("CREATE TABLE shard_info (key TEXT NOT NULL PRIMARY KEY, value TEXT NOT NULL)")
+    version = hashlib.sha256()
+    for name in [table] + derived:
+        for row in conn.execute(f"SELECT * FROM {name} ORDER BY id"):
+            version.update(repr(row).encode('utf-8'))
+    info = {"kind": kind, "key": str(key), "table": table, "rows": str(rows),
+            "version": version.hexdigest()[:16]}
+    conn.executemany("INSERT INTO shard_info VALUES (?, ?)", info.items())
+    conn.execute("PRAGMA user_version = 10")
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.execute("VACUUM")
+    conn.close()
+    return info
 
-    # Translations
-    translations = load_json('translations.json')
-    for t in translations:
-        cursor.execute('''
-            INSERT INTO translations (ayah_id, translator_id, text) VALUES (?,?,?)
-        ''', (t['ayah_id'], t['translator_id'], t['text']))
-    print(f"Inserted {len(translations)} translations")
+def write_shards(db_path, shard_dir, fts=False):
+    """Split db_path into shard_dir/core.db plus per-collection shard DBs"""
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    for old in list(shard_dir.glob('*.db')) + [shard_dir / SHARD_MANIFEST]:
+        if old.exists():
+            old.unlink()
 
-    # Hadith Books
-    books = load_json('hadith_books.json')
-    for b in books:
-        cursor.execute('''
-            INSERT OR REPLACE INTO hadith_books VALUES (?,?,?,?,?,?,?)
-        ''', (b['id'], b['name_english'], b['name_arabic'], b['author'],
-              b['hadith_count'], b['description'], b['icon']))
-    print(f"Inserted {len(books)} hadith books")
-
-    # Hadiths (all books)
-    total_hadiths = 0
-    for book_file in ['hadith_bukhari.json', 'hadith_muslim.json', 'hadith_abudawud.json',
-                      'hadith_tirmidhi.json', 'hadith_nasai.json', 'hadith_ibnmajah.json']:
-        hadiths = load_json(book_file)
-        for h in hadiths:
-            cursor.execute('''
-                INSERT OR REPLACE INTO hadiths VALUES (?,?,?,?,?,?,?,?,?,?)
-            ''', (h['id'], h['book_id'], h['chapter_id'], h['number_in_book'],
-                  h['number_in_chapter'], h['text_arabic'], h['text_english'],
-                  h['narrator'], h['grade'], h['reference']))
-        total_hadiths += len(hadiths)
-        print(f"  Inserted {len(hadiths)} hadiths from {book_file}")
-    print(f"Total hadiths: {total_hadiths}")
+    conn = sqlite3.connect(db_path)
+    groups = list(shard_groups(conn))
+    conn.close()
 
-    # Dua Categories
-    categories = load_json('dua_categories.json')
-    for c in categories:
-        cursor.execute('''
-            INSERT OR REPLACE INTO dua_categories VALUES (?,?,?,?,?,?)
-        ''', (c['id'], c['name_english'], c['name_arabic'], c['icon'],
-              c['display_order'], c['dua_count']))
-    print(f"Inserted {len(categories)} dua categories")
+    shards = []
+    for kind, key, table, column, value, derived in groups:
+        shard_path = shard_dir / f"{kind}_{key}.db"
+        info = write_shard(db_path, shard_path, kind, key, table, column, value, derived, fts)
+        shards.append(dict(info, file=shard_path.name, rows=int(info['rows']),
+                           bytes=shard_path.stat().st_size, sha256=file_sha256(shard_path)))
+
+    # Core: everything except the sharded rows
+    core_path = shard_dir / "core.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute("VACUUM INTO ?", (str(core_path),))
+    conn.close()
+    conn = sqlite3.connect(core_path)
+    sharded = {table for _, table, _, _ in SHARD_KINDS}
+    drop_fts(conn, sharded)
+    existing = {name for name, in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    for _, table, _, derived in SHARD_KINDS:
+        for name in [table] + derived:
+            if name in existing:
+                conn.execute(f"DELETE FROM {name}")
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.execute("VACUUM")
+    conn.close()
 
-    # Duas
-    duas = load_json('duas.json')
-    for d in duas:
-        cursor.execute('''
-            INSERT OR REPLACE INTO duas VALUES (?,?,?,?,?,?,?,?,?,?,?,?)
-        ''', (d['id'], d['category_id'], d['title_english'], d['title_arabic'],
-              d['text_arabic'], d['transliteration'], d['translation'],
-              d['source'], d.get('virtue'), d['repeat_count'],
-              d.get('audio_file'), d['display_order']))
-    print(f"Inserted {len(duas)} duas")
+    manifest = {
+        "schema_version": 10,
+        "core": {"file": core_path.name, "bytes": core_path.stat().st_size,
+                 "sha256": file_sha256(core_path)},
+        "shards": shards,
+    }
+    with open(shard_dir / SHARD_MANIFEST, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"  {'core.db':<36}{manifest['core']['bytes'] / 1024 / 1024:>8.2f} MB")
+    for shard in shards:
+        print(f"  {shard['file']:<36}{shard['bytes'] / 1024 / 1024:>8.2f} MB  "
+              f"{shard['rows']:>7} rows  v{shard['version']}")
+    print(f"Wrote {len(shards)} shards and {SHARD_MANIFEST} to {shard_dir}")
+    return manifest
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the pre-populated Room database from JSON")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"rows per executemany batch (default: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument('--tajweed-workers', type=int, default=None,
+                        help="processes for tajweed pre-parsing (default: one per CPU, 0 = serial)")
+    parser.add_argument('--no-tajweed-cache', action='store_true',
+                        help="re-parse every tajweed entry and rebuild the segment cache")
+    parser.add_argument('--tajweed-encoding', choices=TAJWEED_ENCODINGS, default='json',
+                        help="json: segments JSON in ayahs.text_tajweed (default); "
+                             "binary: compact spans in ayah_tajweed_spans only; both: write both")
+    parser.add_argument('--build-profile', action='store_true',
+                        help="load with fast PRAGMAs in a single transaction, then verify and restore")
+    parser.add_argument('--no-staging', action='store_true',
+                        help="parse the JSON files instead of copying from the staging store (json/staging.db)")
+    parser.add_argument('--fts', action='store_true',
+                        help="build external-content FTS5 indexes for ayahs, translations, hadiths and tafseer "
+                             "(implies --search-tables)")
+    parser.add_argument('--search-tables', action='store_true',
+                        help="build the normalized Arabic search side tables (ayah_search, hadith_search)")
+    parser.add_argument('--name-trigrams', action='store_true',
+                        help="build the name_trigrams as-you-type lookup over the names tables (see name_search.py)")
+    parser.add_argument('--mushaf-pages', action='store_true',
+                        help="build the mushaf_pages table of one denormalized row per page")
+    parser.add_argument('--compress-text', choices=CODECS, default=None,
+                        help="store tafseer and hadith text dictionary-compressed in "
+                             "<table>_compressed BLOB side tables (zstd needs the zstandard package)")
+    parser.add_argument('--page-size', default='auto',
+                        choices=['auto'] + [str(size) for size in PAGE_SIZE_CANDIDATES],
+                        help="page size for the final VACUUM (default: auto, smallest file at 4096 or above)")
+    parser.add_argument('--no-compact', action='store_true',
+                        help="skip ANALYZE/VACUUM and the size report")
+    parser.add_argument('--size-budget-mb', type=float, default=SIZE_BUDGET_MB,
+                        help="fail the build (without recording it in the manifest) if the database "
+                             "file is larger than this")
+    parser.add_argument('--shards', action='store_true',
+                        help=f"also split the result into a core DB and per hadith collection / "
+                             f"tafseer shard DBs under output/{SHARD_DIR_NAME}/")
+    parser.add_argument('--from-db', type=Path, default=None,
+                        help="previous build (with its .manifest.json) to copy tables with unchanged inputs from")
+    parser.add_argument('--full-rebuild', action='store_true',
+                        help="ignore the build manifest and regenerate every table from scratch")
+    args = parser.parse_args(argv)
+    if args.compress_text and not codec_available(args.compress_text):
+        parser.error(f"--compress-text {args.compress_text}: the zstandard package is not installed")
+    if args.compress_text and args.fts:
+        parser.error("--compress-text empties the hadith and tafseer text that --fts would index")
+    # the ayah_search/hadith_search FTS indexes are built over the search tables
+    args.search_tables = args.search_tables or args.fts
 
-    # Islamic Events
-    events = load_json('islamic_events.json')
-    for e in events:
-        cursor.execute('''
-            INSERT OR REPLACE INTO islamic_events VALUES (?,?,?,?,?,?,?,?)
-        ''', (e['id'], e['name_english'], e['name_arabic'], e['hijri_month'],
-              e['hijri_day'], e['event_type'], e['description'],
-              1 if e.get('is_holiday') else 0))
-    print(f"Inserted {len(events)} events")
+    print("=" * 60)
+    print("Nimaz Pro - Database Generator")
+    print("=" * 60)
 
-    # Tasbih Presets
-    presets = load_json('tasbih_presets.json')
-    for p in presets:
-        cursor.execute('''
-            INSERT OR REPLACE INTO tasbih_presets VALUES (?,?,?,?,?,?,?,?)
-        ''', (p.get('id'), p['name'], p['arabic'], p['transliteration'],
-              p['translation'], p['target_count'], 1 if p.get('is_custom') else 0,
-              p['display_order']))
-    print(f"Inserted {len(presets)} tasbih presets")
-
-    # Tafseer - Ibn Kathir
-    tafseer_ibn_kathir = load_json('tafseer_ibn_kathir.json')
-    if tafseer_ibn_kathir:
-        for t in tafseer_ibn_kathir:
-            cursor.execute('''
-                INSERT INTO tafseer_texts (ayah_id, surah_number, ayah_number, tafseer_id, text)
-                VALUES (?,?,?,?,?)
-            ''', (t['ayah_id'], t['surah_number'], t['ayah_number'], 'ibn_kathir_en', t['text']))
-        print(f"Inserted {len(tafseer_ibn_kathir)} Ibn Kathir tafseer entries")
+    manifest = build_manifest({"tajweed_encoding": args.tajweed_encoding, "fts": args.fts,
+                               "compress_text": args.compress_text, "search_tables": args.search_tables,
+                               "name_trigrams": args.name_trigrams, "mushaf_pages": args.mushaf_pages})
+    from_db = args.from_db
+    if from_db is not None:
+        if from_db.resolve() == OUTPUT_DB.resolve():
+            parser.error("--from-db must be a copy of a previous build, not the output database")
+        print(f"\nComparing inputs with {from_db}...")
+        previous = load_manifest(from_db.with_suffix('.manifest.json'))
+        tables = plan_rebuild(previous, manifest, from_db)
+        if tables is None:
+            print(f"Cannot reuse {from_db} (missing, or built from other sources/options)")
+            from_db = None
+        else:
+            recorded_checksums = previous.get('checksums')
+            copied = set(manifest['tables']) - tables
+    if from_db is None:
+        tables = None if args.full_rebuild else plan_rebuild(load_manifest(BUILD_MANIFEST), manifest)
+        if tables is not None and not tables:
+            print("\nDatabase is up to date (no input changes), nothing to do")
+            return 0 if check_size_budget(OUTPUT_DB, args.size_budget_mb) else 1
+
+    # A fresh file: full rebuilds, and builds copying from a previous database
+    fresh = tables is None or from_db is not None
+    if from_db is not None:
+        print(f"\nBuilding from {from_db}: copying {len(copied)} tables, "
+              f"regenerating {', '.join(sorted(tables)) or 'none'}")
+    if fresh:
+        if tables is None:
+            print("\nFull rebuild")
+        # Remove existing database
+        if OUTPUT_DB.exists():
+            OUTPUT_DB.unlink()
+        if BUILD_MANIFEST.exists():
+            BUILD_MANIFEST.unlink()
     else:
-        print("Warning: No Ibn Kathir tafseer data found")
-
-    # Tafseer - Ma'arif al-Qur'an
-    tafseer_maariful = load_json('tafseer_maariful_quran.json')
-    if tafseer_maariful:
-        for t in tafseer_maariful:
-            cursor.execute('''
-                INSERT INTO tafseer_texts (ayah_id, surah_number, ayah_number, tafseer_id, text)
-                VALUES (?,?,?,?,?)
-            ''', (t['ayah_id'], t['surah_number'], t['ayah_number'], 'maariful_quran_en', t['text']))
-        print(f"Inserted {len(tafseer_maariful)} Ma'arif al-Qur'an tafseer entries")
-    else:
-        print("Warning: No Ma'arif al-Qur'an tafseer data found")
+        print(f"\nIncremental rebuild of: {', '.join(sorted(tables))}")
 
-    # Asma ul Husna (99 Names of Allah)
-    asma_ul_husna = load_json('asma_ul_husna.json')
-    if asma_ul_husna:
-        for a in asma_ul_husna:
-            quran_refs = json.dumps(a.get('quran_references', []))
-            cursor.execute('''
-                INSERT OR REPLACE INTO asma_ul_husna VALUES (?,?,?,?,?,?,?,?,?,?,?)
-            ''', (a['id'], a['number'], a['name_arabic'], a['name_transliteration'],
-                  a['name_english'], a['meaning'], a['explanation'], a['benefits'],
-                  quran_refs, a['usage_in_dua'], a['display_order']))
-        print(f"Inserted {len(asma_ul_husna)} Asma ul Husna entries")
-    else:
-        print("Warning: No Asma ul Husna data found")
+    conn = sqlite3.connect(OUTPUT_DB)
 
-    # Asma un Nabi (99 Names of Prophet Muhammad)
-    asma_un_nabi = load_json('asma_un_nabi.json')
-    if asma_un_nabi:
-        for a in asma_un_nabi:
-            cursor.execute('''
-                INSERT OR REPLACE INTO asma_un_nabi VALUES (?,?,?,?,?,?,?,?,?)
-            ''', (a['id'], a['number'], a['name_arabic'], a['name_transliteration'],
-                  a['name_english'], a['meaning'], a['explanation'], a['source'],
-                  a['display_order']))
-        print(f"Inserted {len(asma_un_nabi)} Asma un Nabi entries")
+    # Staging store: restage changed data files, then attach it (outside
+    # any transaction) for the INSERT ... SELECT copies
+    staged = frozenset()
+    if not args.no_staging:
+        print("\nRefreshing staging store...")
+        files = [f for spec in CONTENT_TABLES if 'staged' in spec and (tables is None or spec['table'] in tables)
+                 for f in spec['files']]
+        staged = frozenset(refresh_staging(JSON_DIR, files))
+        print(f"{len(staged)} data files staged")
+        conn.execute("ATTACH DATABASE ? AS staging", (str(staging_path(JSON_DIR)),))
+    if from_db is not None:
+        conn.execute("ATTACH DATABASE ? AS previous", (str(from_db),))
+
+    # Build profile: one transaction for the whole schema + content load
+    single_transaction = args.build_profile
+    if args.build_profile:
+        print("\nUsing build profile (journal in memory, synchronous off, exclusive lock)")
+        apply_build_profile(conn)
+        conn.execute("BEGIN")
+
+    if fresh:
+        print("\nCreating tables...")
+        create_tables(conn, commit=not single_transaction)
     else:
-        print("Warning: No Asma un Nabi data found")
+        print("\nClearing changed tables...")
+        clear_tables(conn, tables)
 
-    # Prophets
-    prophets = load_json('prophets.json')
-    if prophets:
-        for p in prophets:
-            key_lessons = json.dumps(p.get('key_lessons', []))
-            quran_mentions = json.dumps(p.get('quran_mentions', []))
-            miracles = json.dumps(p.get('miracles', []))
-            cursor.execute('''
-                INSERT OR REPLACE INTO prophets VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
-            ''', (p['id'], p['number'], p['name_arabic'], p['name_english'],
-                  p['name_transliteration'], p['title_arabic'], p['title_english'],
-                  p['story_summary'], key_lessons, quran_mentions, p['era'],
-                  p['lineage'], p['years_lived'], p['place_of_preaching'],
-                  miracles, p['display_order']))
-        print(f"Inserted {len(prophets)} prophet entries")
-    else:
-        print("Warning: No prophets data found")
+    if from_db is not None:
+        print(f"\nCopying unchanged tables from {from_db.name}...")
+        copy_previous_tables(conn, copied, recorded_checksums)
 
-    conn.commit()
+    print("\nPopulating database...")
+    populate_database(conn, args.batch_size, commit=not single_transaction,
+                      tajweed_workers=args.tajweed_workers,
+                      tajweed_cache=not args.no_tajweed_cache, tables=tables, staged=staged)
 
-def main():
-    print("=" * 60)
-    print("Nimaz Pro - Database Generator")
-    print("=" * 60)
+    if args.tajweed_encoding != 'json' and (tables is None or 'ayahs' in tables):
+        print(f"\nEncoding tajweed spans ({args.tajweed_encoding})...")
+        encode_tajweed_spans(conn, args.tajweed_encoding, args.batch_size,
+                             commit=not single_transaction)
 
-    # Remove existing database
-    if OUTPUT_DB.exists():
-        OUTPUT_DB.unlink()
+    print("\nCreating indexes...")
+    create_indexes(conn, commit=not single_transaction, tables=None if fresh else tables)
 
-    conn = sqlite3.connect(OUTPUT_DB)
+    if args.mushaf_pages and (tables is None or 'ayahs' in tables):
+        print("\nBuilding mushaf pages...")
+        build_mushaf_pages(conn, commit=not single_transaction)
 
-    print("\nCreating tables...")
-    create_tables(conn)
+    if args.search_tables:
+        print("\nBuilding normalized Arabic search tables...")
+        build_search_tables(conn, args.batch_size, commit=not single_transaction, tables=tables)
 
-    print("\nPopulating database...")
-    populate_database(conn)
+    if args.name_trigrams:
+        print("\nBuilding name trigrams...")
+        build_name_trigrams(conn, args.batch_size, commit=not single_transaction, tables=tables)
+
+    if args.compress_text:
+        print(f"\nCompressing long text ({args.compress_text})...")
+        compress_long_text(conn, args.compress_text, args.batch_size,
+                           commit=not single_transaction, tables=tables)
+
+    if args.fts:
+        print("\nBuilding full-text search indexes...")
+        build_fts(conn, commit=not single_transaction, tables=None if fresh else tables)
 
     # Set Room database version so migrations are skipped
     conn.execute("PRAGMA user_version = 10")
     conn.commit()
     print("\nSet user_version = 10 (Room schema version)")
+    if not args.no_staging:
+        conn.execute("DETACH DATABASE staging")
+    if from_db is not None:
+        conn.execute("DETACH DATABASE previous")
+    # Lets a later --from-db build verify what it copies from this one
+    manifest['checksums'] = content_checksums(conn)
+
+    if args.build_profile:
+        finalize_build_profile(conn)
+
+    if not args.no_compact:
+        print("\nCompacting database...")
+        compact_database(conn, OUTPUT_DB, args.page_size)
+        write_size_report(size_breakdown(conn, OUTPUT_DB), OUTPUT_DB.with_suffix('.size.json'))
 
     conn.close()
+    # An over-budget database is not recorded, so the next run rebuilds it
+    if not check_size_budget(OUTPUT_DB, args.size_budget_mb):
+        if BUILD_MANIFEST.exists():
+            BUILD_MANIFEST.unlink()
+        return 1
+    manifest['database'] = file_fingerprint(OUTPUT_DB)
+    save_manifest(manifest, BUILD_MANIFEST)
 
     print(f"\nDatabase created: {OUTPUT_DB}")
     print(f"Size: {OUTPUT_DB.stat().st_size / 1024 / 1024:.2f} MB")
 
+    if args.shards:
+        print("\nWriting core and shard databases...")
+        write_shards(OUTPUT_DB, OUTPUT_DB.parent / SHARD_DIR_NAME, fts=args.fts)
+    return 0
+
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+On-disk conditional HTTP cache shared by the download scripts.
+
+Every successful GET is stored as two files under CACHE_DIR, keyed by the
+SHA-1 of the URL:
+
+    <key>.body        raw response body
+    <key>.meta.json   url, ETag, Last-Modified, size, fetch time
+
+The next request for the same URL sends If-None-Match / If-Modified-Since,
+and a 304 Not Modified is answered from the stored body, so a refresh only
+transfers payloads that actually changed upstream.  Responses without
+either validator are still cached but always re-downloaded.
+
+Use the shared `http_cache` instance:
+
+    from http_cache import http_cache
+    data = http_cache.get_json(url)
+    ...
+    http_cache.print_stats()
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+CACHE_DIR = Path(__file__).parent.parent / "cache" / "http"
+DEFAULT_HEADERS = {'User-Agent': 'Mozilla/5.0'}
+CHUNK_SIZE = 256 * 1024
+
+
+def _tmp_path(path: Path) -> Path:
+    """Per-process, per-thread temporary name for writing `path` before os.replace"""
+    return path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+
+
+class HTTPCache:
+    """Conditional GET cache with hit/miss counters (thread-safe)"""
+
+    def __init__(self, cache_dir: Path = CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'bytes_downloaded': 0, 'bytes_from_cache': 0}
+
+    def _paths(self, url: str):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return self.cache_dir / f"{key}.body", self.cache_dir / f"{key}.meta.json"
+
+    def _count(self, stat: str, nbytes: int):
+        with self._lock:
+            self.stats[stat] += 1
+            field = 'bytes_from_cache' if stat == 'hits' else 'bytes_downloaded'
+            self.stats[field] += nbytes
+
+    def metadata(self, url: str) -> Optional[Dict[str, Any]]:
+        """Stored metadata for a URL, or None if it is not (fully) cached"""
+        body_path, meta_path = self._paths(url)
+        if not body_path.exists() or not meta_path.exists():
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def validators(self, url: str) -> Dict[str, str]:
+        """Conditional request headers for a cached URL"""
+        meta = self.metadata(url)
+        headers = {}
+        if meta:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def cached_path(self, url: str) -> Path:
+        """Path of the stored body for a URL"""
+        return self._paths(url)[0]
+
+    def _write_meta(self, url: str, response_headers, size: int):
+        _, meta_path = self._paths(url)
+        meta = {
+            'url': url,
+            'etag': response_headers.get('ETag'),
+            'last_modified': response_headers.get('Last-Modified'),
+            'size': size,
+            'fetched_at': time.time(),
+        }
+        tmp_path = _tmp_path(meta_path)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+    def store(self, url: str, response_headers, body: bytes):
+        """Save a 200 response body with its validators"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        body_path, _ = self._paths(url)
+        tmp_path = _tmp_path(body_path)
+        with open(tmp_path, 'wb') as f:
+            f.write(body)
+        os.replace(tmp_path, body_path)
+        self._write_meta(url, response_headers, len(body))
+
+    def record_response(self, url: str, status: int, response_headers, body: bytes) -> bytes:
+        """
+        Resolve a response to a conditional request made by another client
+        (e.g. http_fetch.KeepAliveSession): 304 is served from the cache,
+        200 is stored.  Returns the body to use.
+        """
+        if status == 304:
+            body = self.cached_path(url).read_bytes()
+            self._count('hits', len(body))
+            return body
+        if status == 200:
+            self.store(url, response_headers, body)
+            self._count('misses', len(body))
+        return body
+
+    def _open(self, url: str, headers: Optional[Dict[str, str]], timeout: float):
+        """urlopen with validators; returns the response, or None for a 304"""
+        request_headers = dict(DEFAULT_HEADERS, **(headers or {}))
+        request_headers.update(self.validators(url))
+        req = urllib.request.Request(url, headers=request_headers)
+        try:
+            return urllib.request.urlopen(req, timeout=timeout)
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and self.metadata(url):
+                return None
+            raise
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None, timeout: float = 60) -> bytes:
+        """GET a URL through the cache, returns the body bytes"""
+        response = self._open(url, headers, timeout)
+        if response is None:
+            body = self.cached_path(url).read_bytes()
+            self._count('hits', len(body))
+            return body
+        with response:
+            body = response.read()
+            self.store(url, response.headers, body)
+        self._count('misses', len(body))
+        return body
+
+    def get_json(self, url: str, headers: Optional[Dict[str, str]] = None, timeout: float = 60) -> Any:
+        """GET and parse a JSON document through the cache"""
+        return json.loads(self.get(url, headers, timeout).decode('utf-8'))
+
+    def get_file(self, url: str, headers: Optional[Dict[str, str]] = None, timeout: float = 120) -> Path:
+        """
+        GET a large document through the cache, streaming the body to disk.
+
+        Returns:
+            Path of the cached body (read it, do not modify it)
+        """
+        response = self._open(url, headers, timeout)
+        body_path = self.cached_path(url)
+        if response is None:
+            self._count('hits', body_path.stat().st_size)
+            return body_path
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = _tmp_path(body_path)
+        with response, open(tmp_path, 'wb') as f:
+            shutil.copyfileobj(response, f, CHUNK_SIZE)
+            response_headers = response.headers
+        os.replace(tmp_path, body_path)
+        size = body_path.stat().st_size
+        self._write_meta(url, response_headers, size)
+        self._count('misses', size)
+        return body_path
+
+    def print_stats(self):
+        """Print hit/miss counts and bytes transferred vs served from cache"""
+        stats = self.stats
+        requests = stats['hits'] + stats['misses']
+        if not requests:
+            return
+        print(f"\nHTTP cache: {stats['hits']} hits (304), {stats['misses']} misses "
+              f"of {requests} requests ({100 * stats['hits'] / requests:.0f}% hit rate)")
+        print(f"  Downloaded {stats['bytes_downloaded'] / 1024 / 1024:.1f} MB, "
+              f"served {stats['bytes_from_cache'] / 1024 / 1024:.1f} MB from cache")
+
+
+http_cache = HTTPCache()
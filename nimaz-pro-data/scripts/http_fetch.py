@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP helpers for the download scripts.
+
+- KeepAliveSession: persistent HTTP(S) connections (one per host per
+  worker thread, since http.client connections are not thread-safe) so a
+  run of requests to the same API reuses its TCP/TLS handshake.
+- TokenBucket: thread-safe rate limiter replacing fixed time.sleep() calls
+  between requests.
+- fetch_concurrently: run a fetch function over many items on a bounded
+  thread pool, returning results in input order with per-item latency.
+
+A session given an http_cache.HTTPCache sends conditional requests and
+serves 304 responses from it.
+"""
+
+import http.client
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+DEFAULT_HEADERS = {'User-Agent': 'Mozilla/5.0', 'Accept': 'application/json'}
+MAX_REDIRECTS = 3
+
+
+class HTTPStatusError(Exception):
+    """Non-success HTTP status"""
+
+    def __init__(self, url: str, status: int):
+        super().__init__(f"HTTP {status} for {url}")
+        self.url = url
+        self.status = status
+
+
+class TokenBucket:
+    """
+    Allow `rate` acquisitions per second on average, with bursts of up to
+    `capacity`.  acquire() blocks until a token is available.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class KeepAliveSession:
+    """GET requests over persistent connections, one per host per thread"""
+
+    def __init__(self, headers: Optional[Dict[str, str]] = None, timeout: float = 60, cache=None):
+        self.headers = dict(DEFAULT_HEADERS, **(headers or {}))
+        self.timeout = timeout
+        self.cache = cache
+        self._local = threading.local()
+        self._all_connections = []
+        self._lock = threading.Lock()
+
+    def _connection(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        connections = getattr(self._local, 'connections', None)
+        if connections is None:
+            connections = self._local.connections = {}
+        conn = connections.get((scheme, netloc))
+        if conn is None:
+            conn_class = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+            conn = conn_class(netloc, timeout=self.timeout)
+            connections[(scheme, netloc)] = conn
+            with self._lock:
+                self._all_connections.append(conn)
+        return conn
+
+    def _drop_connection(self, scheme: str, netloc: str):
+        conn = self._local.connections.pop((scheme, netloc), None)
+        if conn is not None:
+            conn.close()
+
+    def request(self, url: str, headers: Optional[Dict[str, str]] = None
+                ) -> Tuple[int, http.client.HTTPMessage, bytes]:
+        """
+        GET a URL, following redirects.
+
+        Returns:
+            (status, response headers, body bytes)
+        """
+        for _ in range(MAX_REDIRECTS + 1):
+            parts = urlsplit(url)
+            path = parts.path or '/'
+            if parts.query:
+                path += '?' + parts.query
+            request_headers = dict(self.headers, **(headers or {}))
+
+            # A kept-alive connection may have been closed by the server;
+            # retry once on a fresh one before giving up
+            for attempt in range(2):
+                conn = self._connection(parts.scheme, parts.netloc)
+                try:
+                    conn.request('GET', path, headers=request_headers)
+                    response = conn.getresponse()
+                    body = response.read()
+                    break
+                except (http.client.HTTPException, OSError):
+                    self._drop_connection(parts.scheme, parts.netloc)
+                    if attempt == 1:
+                        raise
+
+            if response.will_close:
+                self._drop_connection(parts.scheme, parts.netloc)
+            if response.status in (301, 302, 303, 307, 308) and response.getheader('Location'):
+                url = urljoin(url, response.getheader('Location'))
+                continue
+            return response.status, response.headers, body
+        raise HTTPStatusError(url, response.status)
+
+    def get_json(self, url: str, retries: int = 3, backoff: float = 2) -> Any:
+        """GET and parse JSON, retrying failures. Raises the last error."""
+        for attempt in range(retries):
+            try:
+                if self.cache is None:
+                    status, _, body = self.request(url)
+                else:
+                    status, response_headers, body = self.request(url, self.cache.validators(url))
+                    body = self.cache.record_response(url, status, response_headers, body)
+                    if status == 304:
+                        status = 200
+                if status != 200:
+                    raise HTTPStatusError(url, status)
+                return json.loads(body.decode('utf-8'))
+            except Exception as e:
+                if attempt == retries - 1:
+                    raise
+                print(f"    Attempt {attempt + 1} failed for {url}: {e}")
+                time.sleep(backoff)
+
+    def close(self):
+        with self._lock:
+            for conn in self._all_connections:
+                conn.close()
+            self._all_connections.clear()
+
+
+def fetch_concurrently(items: Iterable[Any], fetch: Callable[[Any], Any], workers: int = 8,
+                       rate_limiter: Optional[TokenBucket] = None
+                       ) -> List[Tuple[Any, Any, float, Optional[Exception]]]:
+    """
+    Call fetch(item) for every item on a thread pool.
+
+    Returns:
+        List of (item, result, latency seconds, error) in input order;
+        result is None and error is set when fetch raised
+    """
+    def run(item):
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        start = time.perf_counter()
+        try:
+            result, error = fetch(item), None
+        except Exception as e:
+            result, error = None, e
+        return item, result, time.perf_counter() - start, error
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(run, items))
+
+
+def latency_summary(latencies: List[float]) -> str:
+    """One-line min/median/p95/max summary of request latencies"""
+    if not latencies:
+        return "no requests"
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return (f"{len(ordered)} requests, min {ordered[0] * 1000:.0f} ms, "
+            f"median {ordered[len(ordered) // 2] * 1000:.0f} ms, "
+            f"p95 {p95 * 1000:.0f} ms, max {ordered[-1] * 1000:.0f} ms")
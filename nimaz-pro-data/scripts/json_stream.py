@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+"""
+Incremental readers and writers for the JSON data files.
+
+The generator only ever walks these files front to back, so holding a
+whole ayahs.json or hadith collection in memory is wasted RSS.  This
+module streams records straight off disk:
+
+  - JSON Lines (one record per line) via iter_jsonl / write_jsonl
+  - Regular JSON files whose top level is an array or object, decoded one
+    element at a time with json.JSONDecoder.raw_decode over a sliding
+    buffer (no third-party parser needed)
+
+iter_records() picks whichever of `name.json` / `name.jsonl` /
+`name.msgpack` is newest.
+
+It is also the serialization layer for the json/ directory: writers call
+save_data() and readers load_data() / iter_records() with the logical
+`name.json` file name, and the on-disk format comes from DATA_FORMAT
+(environment variable NIMAZ_DATA_FORMAT):
+
+    json      indented JSON, the default: the layout of the committed
+              json/ files, so their git diffs stay readable
+    compact   JSON without indentation or spaces after separators
+    jsonl     one record per line for top-level arrays; objects (e.g.
+              tajweed.json) have no line form and are written compact
+    msgpack   MessagePack, via the msgpack package when installed or the
+              pure-Python codec below (same wire format)
+
+The other formats are opt-in for local builds.  Writing a file in one
+replaces its committed .json copy (see save_data).
+
+Run standalone to convert the json/ directory or compare formats:
+
+    python json_stream.py benchmark [file ...]
+    python json_stream.py convert FORMAT [file ...]
+"""
+
+import json
+import os
+import struct
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+CHUNK_SIZE = 64 * 1024
+
+# Format -> file suffix
+DATA_FORMATS = {'json': '.json', 'compact': '.json', 'jsonl': '.jsonl', 'msgpack': '.msgpack'}
+DATA_FORMAT = os.environ.get('NIMAZ_DATA_FORMAT', 'json')
+DATA_SUFFIXES = ['.json', '.jsonl', '.msgpack']
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+_NUMBER_CHARS = '0123456789.eE+-'
+
+
+class _StreamBuffer:
+    """Sliding text window over a file for element-wise JSON decoding"""
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        """Read another chunk, dropping consumed text. Returns False at EOF."""
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Return the next non-whitespace character without consuming it"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                raise ValueError(f"Unexpected end of JSON in {self.f.name}")
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' at offset {self.pos} in {self.f.name}")
+        self.pos += 1
+
+    def value(self):
+        """Decode one complete JSON value at the current position"""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # Value straddles the chunk boundary
+                if not self._fill():
+                    raise
+                continue
+            # A number cut by the buffer edge ("2." of "2.5e3") decodes early
+            if (isinstance(value, (int, float)) and not isinstance(value, bool)
+                    and (end == len(self.buf) or self.buf[end] in _NUMBER_CHARS)
+                    and not self.eof and self._fill()):
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json(path, chunk_size=CHUNK_SIZE):
+    """
+    Stream the top level of a JSON file.
+
+    Yields:
+        Elements of a top-level array, or (key, value) pairs of a
+        top-level object, decoded one at a time.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        stream = _StreamBuffer(f, chunk_size)
+        opening = stream.peek()
+        if opening not in '[{':
+            raise ValueError(f"{path} must contain a JSON array or object")
+        closing = ']' if opening == '[' else '}'
+        stream.expect(opening)
+
+        if stream.peek() == closing:
+            return
+        while True:
+            if opening == '[':
+                yield stream.value()
+            else:
+                key = stream.value()
+                stream.expect(':')
+                yield key, stream.value()
+
+            if stream.peek() == closing:
+                return
+            stream.expect(',')
+
+
+def iter_jsonl(path):
+    """Yield one decoded record per non-blank line of a JSON Lines file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def write_jsonl(path, records):
+    """Write an iterable of records as JSON Lines, returns the record count"""
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False))
+            f.write('\n')
+            count += 1
+    return count
+
+
+def resolve_data_path(json_dir, filename):
+    """
+    Find the on-disk file for a logical data file name.
+
+    `hadith_bukhari.json` may exist as hadith_bukhari.json, .jsonl and/or
+    .msgpack; the most recently written one wins.
+    Returns None if none exists.
+    """
+    json_path = Path(json_dir) / filename
+    candidates = [p for p in (json_path.with_suffix(suffix) for suffix in DATA_SUFFIXES) if p.exists()]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda p: p.stat().st_mtime)
+
+
+def iter_records(json_dir, filename):
+    """Stream the records of a data file (array elements or JSONL lines)"""
+    path = resolve_data_path(json_dir, filename)
+    if path is None:
+        return
+    if path.suffix == '.jsonl':
+        yield from iter_jsonl(path)
+    elif path.suffix == '.msgpack':
+        data = read_msgpack(path)
+        yield from data.items() if isinstance(data, dict) else data
+    else:
+        yield from iter_json(path)
+
+
+# ── MessagePack ───────────────────────────────────────────────────────
+# Minimal codec for the JSON data model (nil, bool, int, float, str,
+# array, map), used when the msgpack package is not installed.
+
+def _pack(obj, out):
+    if obj is None:
+        out.append(0xc0)
+    elif obj is True:
+        out.append(0xc3)
+    elif obj is False:
+        out.append(0xc2)
+    elif isinstance(obj, int):
+        if 0 <= obj < 0x80:
+            out.append(obj)
+        elif -32 <= obj < 0:
+            out.append(obj & 0xff)
+        elif 0 <= obj <= 0xffffffff:
+            out += struct.pack('>BI', 0xce, obj) if obj > 0xffff else struct.pack('>BH', 0xcd, obj)
+        elif -0x80000000 <= obj < 0:
+            out += struct.pack('>Bi', 0xd2, obj)
+        else:
+            out += struct.pack('>Bq', 0xd3, obj)
+    elif isinstance(obj, float):
+        out += struct.pack('>Bd', 0xcb, obj)
+    elif isinstance(obj, str):
+        data = obj.encode('utf-8')
+        n = len(data)
+        if n < 32:
+            out.append(0xa0 | n)
+        elif n <= 0xff:
+            out += struct.pack('>BB', 0xd9, n)
+        elif n <= 0xffff:
+            out += struct.pack('>BH', 0xda, n)
+        else:
+            out += struct.pack('>BI', 0xdb, n)
+        out += data
+    elif isinstance(obj, (list, tuple)):
+        n = len(obj)
+        if n < 16:
+            out.append(0x90 | n)
+        elif n <= 0xffff:
+            out += struct.pack('>BH', 0xdc, n)
+        else:
+            out += struct.pack('>BI', 0xdd, n)
+        for item in obj:
+            _pack(item, out)
+    elif isinstance(obj, dict):
+        n = len(obj)
+        if n < 16:
+            out.append(0x80 | n)
+        elif n <= 0xffff:
+            out += struct.pack('>BH', 0xde, n)
+        else:
+            out += struct.pack('>BI', 0xdf, n)
+        for key, value in obj.items():
+            _pack(key, out)
+            _pack(value, out)
+    else:
+        raise TypeError(f"Cannot pack {type(obj).__name__}")
+
+
+# Fixed-size types: lead byte -> struct format
+_FIXED = {0xca: '>f', 0xcb: '>d', 0xcc: '>B', 0xcd: '>H', 0xce: '>I', 0xcf: '>Q',
+          0xd0: '>b', 0xd1: '>h', 0xd2: '>i', 0xd3: '>q'}
+# Variable-size types: lead byte -> (length format, kind)
+_SIZED = {0xd9: ('>B', 'str'), 0xda: ('>H', 'str'), 0xdb: ('>I', 'str'),
+          0xc4: ('>B', 'bin'), 0xc5: ('>H', 'bin'), 0xc6: ('>I', 'bin'),
+          0xdc: ('>H', 'array'), 0xdd: ('>I', 'array'),
+          0xde: ('>H', 'map'), 0xdf: ('>I', 'map')}
+
+
+def _unpack(data, pos):
+    """Decode one value at pos, returns (value, new pos)"""
+    lead = data[pos]
+    pos += 1
+    if lead < 0x80:
+        return lead, pos
+    if lead >= 0xe0:
+        return lead - 0x100, pos
+    if 0xa0 <= lead <= 0xbf:
+        kind, n = 'str', lead & 0x1f
+    elif 0x90 <= lead <= 0x9f:
+        kind, n = 'array', lead & 0x0f
+    elif 0x80 <= lead <= 0x8f:
+        kind, n = 'map', lead & 0x0f
+    elif lead == 0xc0:
+        return None, pos
+    elif lead == 0xc2:
+        return False, pos
+    elif lead == 0xc3:
+        return True, pos
+    elif lead in _FIXED:
+        fmt = _FIXED[lead]
+        return struct.unpack_from(fmt, data, pos)[0], pos + struct.calcsize(fmt)
+    elif lead in _SIZED:
+        fmt, kind = _SIZED[lead]
+        n = struct.unpack_from(fmt, data, pos)[0]
+        pos += struct.calcsize(fmt)
+    else:
+        raise ValueError(f"Unsupported MessagePack type 0x{lead:02x} at offset {pos - 1}")
+
+    if kind == 'str':
+        return data[pos:pos + n].decode('utf-8'), pos + n
+    if kind == 'bin':
+        return bytes(data[pos:pos + n]), pos + n
+    if kind == 'array':
+        items = []
+        for _ in range(n):
+            item, pos = _unpack(data, pos)
+            items.append(item)
+        return items, pos
+    result = {}
+    for _ in range(n):
+        key, pos = _unpack(data, pos)
+        result[key], pos = _unpack(data, pos)
+    return result, pos
+
+
+def _string_keys(obj):
+    """Map keys as strings, as a JSON round trip would leave them"""
+    if isinstance(obj, dict):
+        return {key if isinstance(key, str) else json.dumps(key): _string_keys(value)
+                for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [_string_keys(item) for item in obj]
+    return obj
+
+
+def pack_msgpack(data):
+    data = _string_keys(data)
+    if msgpack is not None:
+        return msgpack.packb(data, use_bin_type=True)
+    out = bytearray()
+    _pack(data, out)
+    return bytes(out)
+
+
+def unpack_msgpack(payload):
+    if msgpack is not None:
+        return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+    value, _ = _unpack(payload, 0)
+    return value
+
+
+def read_msgpack(path):
+    with open(path, 'rb') as f:
+        return unpack_msgpack(f.read())
+
+
+# ── Whole-file load / save ────────────────────────────────────────────
+
+def load_data(json_dir, filename, default=None):
+    """
+    Load a whole data file in whichever format it is stored.
+
+    Returns:
+        The decoded array or object, or `default` if the file is missing
+    """
+    path = resolve_data_path(json_dir, filename)
+    if path is None:
+        return default
+    if path.suffix == '.jsonl':
+        return list(iter_jsonl(path))
+    if path.suffix == '.msgpack':
+        return read_msgpack(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_data(json_dir, filename, data, fmt=None):
+    """
+    Write a data file in `fmt` (default DATA_FORMAT), removing copies of
+    the same file in other formats so readers cannot pick a stale one.
+
+    Returns:
+        Path of the written file
+    """
+    fmt = fmt or DATA_FORMAT
+    if fmt not in DATA_FORMATS:
+        raise ValueError(f"Unknown data format {fmt!r} (expected one of {', '.join(DATA_FORMATS)})")
+    if fmt == 'jsonl' and not isinstance(data, list):
+        fmt = 'compact'
+    path = (Path(json_dir) / filename).with_suffix(DATA_FORMATS[fmt])
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    tmp_path = path.with_name(path.name + '.tmp')
+    if fmt == 'jsonl':
+        write_jsonl(tmp_path, data)
+    elif fmt == 'msgpack':
+        with open(tmp_path, 'wb') as f:
+            f.write(pack_msgpack(data))
+    else:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            if fmt == 'json':
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            else:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+    for suffix in DATA_SUFFIXES:
+        other = path.with_suffix(suffix)
+        if other != path and other.exists():
+            other.unlink()
+    return path
+
+
+def benchmark(json_dir, filenames, repeat=3):
+    """Save and load each file in every format, print size and best times"""
+    print(f"{'File':<28}{'Format':<9}{'Size KB':>10}{'Save ms':>10}{'Load ms':>10}{'Stream ms':>11}")
+    print("-" * 78)
+    totals = {fmt: [0, 0.0, 0.0] for fmt in DATA_FORMATS}
+    with tempfile.TemporaryDirectory() as tmp:
+        for filename in filenames:
+            data = load_data(json_dir, filename)
+            if data is None:
+                continue
+            for fmt in DATA_FORMATS:
+                save_best = load_best = stream_best = float('inf')
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    path = save_data(tmp, filename, data, fmt)
+                    save_best = min(save_best, time.perf_counter() - start)
+                    start = time.perf_counter()
+                    loaded = load_data(tmp, filename)
+                    load_best = min(load_best, time.perf_counter() - start)
+                    start = time.perf_counter()
+                    for _ in iter_records(tmp, filename):
+                        pass
+                    stream_best = min(stream_best, time.perf_counter() - start)
+                if _string_keys(loaded) != _string_keys(data):
+                    raise SystemExit(f"Round-trip mismatch for {filename} as {fmt}")
+                size = path.stat().st_size
+                totals[fmt][0] += size
+                totals[fmt][1] += save_best
+                totals[fmt][2] += load_best
+                print(f"{filename:<28}{fmt:<9}{size / 1024:>10,.1f}{save_best * 1000:>10.1f}"
+                      f"{load_best * 1000:>10.1f}{stream_best * 1000:>11.1f}")
+    print("-" * 78)
+    for fmt, (size, save_time, load_time) in totals.items():
+        print(f"{'Total':<28}{fmt:<9}{size / 1024:>10,.1f}{save_time * 1000:>10.1f}{load_time * 1000:>10.1f}")
+    codec = "msgpack package" if msgpack is not None else "built-in codec"
+    print(f"Best of {repeat}; msgpack via {codec}")
+
+
+if __name__ == "__main__":
+    json_dir = Path(__file__).parent.parent / "json"
+    args = sys.argv[1:]
+    if not args or args[0] not in ('benchmark', 'convert'):
+        print(__doc__)
+        sys.exit(1)
+
+    command = args.pop(0)
+    fmt = None
+    if command == 'convert':
+        if not args or args[0] not in DATA_FORMATS:
+            print(f"Usage: python json_stream.py convert {{{'|'.join(DATA_FORMATS)}}} [file ...]")
+            sys.exit(1)
+        fmt = args.pop(0)
+    filenames = args or sorted({p.with_suffix('.json').name for p in json_dir.iterdir()
+                                if p.suffix in DATA_SUFFIXES and p.stem != 'tajweed_parsed'})
+
+    if command == 'benchmark':
+        benchmark(json_dir, filenames)
+    else:
+        for filename in filenames:
+            data = load_data(json_dir, filename)
+            if data is not None:
+                path = save_data(json_dir, filename, data, fmt)
+                print(f"  {filename} -> {path.name} ({path.stat().st_size / 1024:,.1f} KB)")
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Trigram lookup for as-you-type search over the names tables.
+
+generate_database --name-trigrams writes one `name_trigrams` row per
+(gram, entity, id) for the fields in NAME_SEARCH_FIELDS.  Field text is folded with
+normalize_arabic() (which also strips Latin accents: Raḥīm -> Rahim) and
+casefold(), then padded with one space in front and two behind so every
+substring of one or two characters is the prefix of some trigram.
+
+A query then becomes an indexed lookup instead of a LIKE scan per column:
+
+  - 3+ characters: entities containing every query trigram
+        SELECT entity, entity_id FROM name_trigrams WHERE gram IN (...)
+        GROUP BY entity, entity_id HAVING COUNT(DISTINCT gram) = <n grams>
+  - 1-2 characters: a range scan for grams starting with the query
+
+Trigram hits are candidates (the grams may not be contiguous), so
+search_names() re-checks each candidate's fields for the full substring.
+
+Usage:
+    python name_search.py [--db PATH] [--entity TABLE] query
+"""
+
+import argparse
+import sqlite3
+from pathlib import Path
+
+from arabic_normalize import normalize_arabic
+
+DB_FILE = Path(__file__).parent.parent / "output" / "nimaz_prepopulated.db"
+
+GRAM_SIZE = 3
+
+# Searchable fields per table: name, transliteration and meaning/title
+NAME_SEARCH_FIELDS = {
+    'asma_ul_husna': ['name_arabic', 'name_transliteration', 'name_english', 'meaning'],
+    'asma_un_nabi': ['name_arabic', 'name_transliteration', 'name_english', 'meaning'],
+    'prophets': ['name_arabic', 'name_transliteration', 'name_english', 'title_english'],
+    'surahs': ['name_arabic', 'name_transliteration', 'name_english'],
+}
+
+
+def fold(text):
+    """Case- and accent-insensitive search form of a field or query"""
+    return normalize_arabic(text).casefold()
+
+
+def name_grams(text):
+    """Set of trigrams of a folded, space-padded field value"""
+    folded = fold(text)
+    if not folded:
+        return set()
+    padded = f" {folded}  "
+    return {padded[i:i + GRAM_SIZE] for i in range(len(padded) - GRAM_SIZE + 1)}
+
+
+def entity_grams(conn, table):
+    """Yield (gram, entity, id) rows for every row of a names table"""
+    fields = NAME_SEARCH_FIELDS[table]
+    for row in conn.execute(f"SELECT id, {', '.join(fields)} FROM {table} ORDER BY id"):
+        grams = set()
+        for value in row[1:]:
+            grams |= name_grams(value)
+        for gram in sorted(grams):
+            yield gram, table, row[0]
+
+
+def candidate_ids(conn, query, entity=None):
+    """(entity, id) pairs whose trigrams cover the folded query"""
+    folded = fold(query)
+    if not folded:
+        return []
+    entity_filter = " AND entity = ?" if entity else ""
+    entity_params = (entity,) if entity else ()
+
+    if len(folded) < GRAM_SIZE:
+        # gram >= q AND gram < q + U+FFFF is a prefix range on the primary key
+        sql = (f"SELECT DISTINCT entity, entity_id FROM name_trigrams "
+               f"WHERE gram >= ? AND gram < ?{entity_filter}")
+        return conn.execute(sql, (folded, folded + '\uffff') + entity_params).fetchall()
+
+    grams = sorted({folded[i:i + GRAM_SIZE] for i in range(len(folded) - GRAM_SIZE + 1)})
+    sql = (f"SELECT entity, entity_id FROM name_trigrams "
+           f"WHERE gram IN ({', '.join('?' * len(grams))}){entity_filter} "
+           f"GROUP BY entity, entity_id HAVING COUNT(DISTINCT gram) = ?")
+    return conn.execute(sql, tuple(grams) + entity_params + (len(grams),)).fetchall()
+
+
+def search_names(conn, query, entity=None):
+    """
+    Search the names tables.
+
+    Args:
+        entity: Restrict to one table of NAME_SEARCH_FIELDS
+
+    Returns:
+        List of (entity, id, matched field value), ordered by table then id
+    """
+    folded = fold(query)
+    results = []
+    for table, entity_id in sorted(candidate_ids(conn, query, entity)):
+        fields = NAME_SEARCH_FIELDS[table]
+        row = conn.execute(f"SELECT {', '.join(fields)} FROM {table} WHERE id = ?", (entity_id,)).fetchone()
+        for value in row:
+            if value and folded in fold(value):
+                results.append((table, entity_id, value))
+                break
+    return results
+
+
+if __name__ == "__main__":
+    import time
+
+    parser = argparse.ArgumentParser(description="Search the names tables as you type")
+    parser.add_argument('--db', type=Path, default=DB_FILE, help=f"database to search (default: {DB_FILE})")
+    parser.add_argument('--entity', choices=sorted(NAME_SEARCH_FIELDS), default=None,
+                        help="restrict the search to one table")
+    parser.add_argument('query', nargs='+', help="text to search for")
+    args = parser.parse_args()
+    if not args.db.exists():
+        parser.error(f"{args.db} not found")
+    entity = args.entity
+
+    conn = sqlite3.connect(args.db)
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'name_trigrams'").fetchone() is None:
+        parser.error(f"{args.db} has no name_trigrams table (build it with generate_database.py --name-trigrams)")
+    query = ' '.join(args.query)
+    # Simulate typing the query one character at a time
+    for end in range(1, len(query) + 1):
+        prefix = query[:end]
+        start = time.perf_counter()
+        results = search_names(conn, prefix, entity)
+        elapsed = time.perf_counter() - start
+        print(f"{prefix!r:<24}{len(results):>5} results {elapsed * 1000:8.2f} ms")
+    for table, entity_id, value in results[:20]:
+        print(f"  {table}:{entity_id}  {value[:70]}")
+    conn.close()
@@ -2,9 +2,10 @@
 """
 Parse surah_info SQL INSERT statements and convert to JSON
 """
-import json
 import re
 
+from json_stream import save_data
+
 sql_statements = """
 INSERT INTO surah_info (surahNumber, description, themes) VALUES (1, 'Al-Fatiha (The Opening) is the most recited surah, serving as the essence of the Quran. It includes praise of Allah, seeking guidance, and supplication for the straight path.', 'Praise,Guidance,Supplication,Mercy,Divine Attributes')
 INSERT INTO surah_info (surahNumber, description, themes) VALUES (2, 'Al-Baqarah (The Cow) is the longest surah, covering fundamental Islamic teachings including faith, law, and guidance. It addresses believers, disbelievers, and hypocrites, establishing rules for worship, family, and society.', 'Faith,Law,Guidance,Stories of Prophets,Social Justice')
@@ -144,8 +145,6 @@ if __name__ == "__main__":
     surah_data = parse_sql_to_json()
     print(f"Parsed {len(surah_data)} surah info entries")
 
-    output_file = "../json/surah_info.json"
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(surah_data, f, ensure_ascii=False, indent=2)
+    output_file = save_data("../json", "surah_info.json", surah_data)
 
     print(f"Created {output_file}")
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Run the whole data pipeline, from the downloads to the app assets.
+
+Each stage in STAGES declares the files it reads and writes; a stage
+depends on the stages producing its inputs (plus any listed in 'after').
+Stages run on a thread pool as soon as their dependencies are done, so
+the independent downloads (Quran, hadith, tafseer, tajweed,
+transliteration) overlap; their progress output interleaves.
+
+A stage is skipped when it is up to date:
+
+  - every output exists, and
+  - for a download (no inputs): its last successful run, or its outputs
+    if the pipeline never ran it, is at most --max-age days old
+    (DOWNLOAD_MAX_AGE_DAYS, 0 = never refetch on age alone)
+  - otherwise: no input is newer than the stamp the pipeline wrote the
+    last time the stage succeeded
+
+--force runs every selected stage regardless, e.g. to pick up upstream
+data corrections before the age limit.
+
+Data files are logical json/ names resolved with json_stream, so any
+serialization format counts.  Stamps live in cache/pipeline/.  A failed
+stage (including a download that came back incomplete) gets no stamp, so
+the next run retries it; it blocks everything downstream of it, and the
+rest still runs.
+
+Usage:
+    python pipeline.py [stage ...] [--force] [--dry-run] [--list] [--workers N]
+                       [--max-age DAYS] [-- generate_database args]
+
+Naming stages runs those and whatever they depend on.  Arguments after
+`--` replace the default generate_database arguments (--build-profile);
+the generate stage's stamp records them, so changing them reruns it.
+"""
+
+import argparse
+import json
+import shutil
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+import download_and_generate
+import download_full_data
+import download_tafseer
+import download_transliteration
+import fetch_tajweed
+import generate_database
+import remove_bismillah
+import verify_database
+from http_cache import http_cache
+from json_stream import resolve_data_path
+
+BASE_DIR = Path(__file__).parent.parent
+JSON_DIR = BASE_DIR / "json"
+STAMP_DIR = BASE_DIR / "cache" / "pipeline"
+OUTPUT_DB = generate_database.OUTPUT_DB
+ASSETS_DB = BASE_DIR.parent / "app" / "src" / "main" / "assets" / "database" / "nimaz_prepopulated.db"
+
+# Stages run concurrently (the downloads each use their own pools as well)
+PIPELINE_WORKERS = 4
+# Downloads older than this are fetched again (unchanged files come back
+# from the HTTP cache as 304s)
+DOWNLOAD_MAX_AGE_DAYS = 30
+GENERATE_ARGS = ['--build-profile']
+SCRIPTS_DIR = Path(__file__).parent
+
+
+# ── Stage actions ─────────────────────────────────────────────────────
+# A stage fails if its action raises or returns False.  A stage with an
+# 'args' list passes it to its action.
+
+def download_tajweed():
+    """Fails the stage if any page failed, keeping the previous tajweed.json"""
+    return bool(fetch_tajweed.load_tajweed('refresh'))
+
+def generate_static_data():
+    download_and_generate.generate_hadith_books()
+    download_and_generate.generate_islamic_events()
+    download_and_generate.generate_tasbih_presets()
+
+def generate(args):
+    return generate_database.main(list(args)) == 0
+
+def verify_output():
+    """Fails the stage (and so blocks install) if verification finds a problem"""
+    return verify_database.verify_database(OUTPUT_DB)
+
+def install_database():
+    ASSETS_DB.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copy(OUTPUT_DB, ASSETS_DB)
+    print(f"Database copied to: {ASSETS_DB}")
+
+
+# ── Stages ────────────────────────────────────────────────────────────
+# Strings are json/ data files, Paths are plain files.
+
+HADITH_OUTPUTS = [f"hadith_{c['key']}.json" for c in download_full_data.HADITH_COLLECTIONS]
+TAFSEER_OUTPUTS = [filename for _, _, filename in download_tafseer.TAFSEERS]
+GENERATE_INPUTS = (sorted({f for files in generate_database.table_inputs().values() for f in files})
+                   + [SCRIPTS_DIR / source for source in generate_database.GENERATOR_SOURCES])
+
+STAGES = [
+    {"name": "quran", "run": download_and_generate.download_quran_data,
+     "inputs": [], "outputs": ["surahs.json", "ayahs.json", "translations.json"]},
+    {"name": "hadith", "run": download_full_data.download_full_hadith_data,
+     "inputs": [], "outputs": HADITH_OUTPUTS},
+    {"name": "tafseer", "run": download_tafseer.download_all_tafseers,
+     "inputs": [], "outputs": TAFSEER_OUTPUTS},
+    {"name": "tajweed", "run": download_tajweed,
+     "inputs": [], "outputs": ["tajweed.json"]},
+    {"name": "transliteration", "run": download_transliteration.download_transliteration,
+     "inputs": [], "outputs": ["transliteration.json"]},
+    {"name": "static", "run": generate_static_data,
+     "inputs": [SCRIPTS_DIR / "download_and_generate.py"],
+     "outputs": ["hadith_books.json", "islamic_events.json", "tasbih_presets.json"]},
+    {"name": "duas", "run": download_full_data.generate_expanded_duas,
+     "inputs": [SCRIPTS_DIR / "download_full_data.py"], "outputs": ["duas.json", "dua_categories.json"]},
+    # Rewrites ayahs.json in place
+    {"name": "bismillah", "run": remove_bismillah.remove_bismillah_from_ayahs,
+     "inputs": ["ayahs.json"], "outputs": ["ayahs.json"]},
+    {"name": "generate", "run": generate, "args": GENERATE_ARGS,
+     "inputs": GENERATE_INPUTS, "outputs": [OUTPUT_DB]},
+    {"name": "verify", "run": verify_output,
+     "inputs": [OUTPUT_DB], "outputs": []},
+    {"name": "install", "run": install_database,
+     "inputs": [OUTPUT_DB], "outputs": [ASSETS_DB], "after": ["verify"]},
+]
+
+
+def file_path(item):
+    """Path of a stage input/output, None if a data file does not exist in any format"""
+    if isinstance(item, Path):
+        return item
+    return resolve_data_path(JSON_DIR, item)
+
+def stamp_path(stage):
+    return STAMP_DIR / f"{stage['name']}.done"
+
+def stamp_text(stage):
+    """Stamp contents: the run time, then the stage's args (if any) as JSON"""
+    text = f"{time.time()}\n"
+    if 'args' in stage:
+        text += json.dumps(stage['args']) + "\n"
+    return text
+
+def with_generate_args(stages, generate_args):
+    """Copy of `stages` whose generate stage runs with `generate_args`"""
+    return [dict(stage, args=list(generate_args)) if stage['name'] == 'generate' else stage
+            for stage in stages]
+
+def stage_dependencies(stages):
+    """{stage name: names of the stages it waits for}"""
+    producers = {}
+    for stage in stages:
+        for output in stage['outputs']:
+            producers.setdefault(output, []).append(stage['name'])
+
+    deps = {}
+    for stage in stages:
+        names = list(stage.get('after', []))
+        for item in stage['inputs']:
+            # Earlier stages only, so in-place stages depend on the original producer
+            for producer in producers.get(item, []):
+                if producer == stage['name']:
+                    break
+                if producer not in names:
+                    names.append(producer)
+        deps[stage['name']] = names
+    return deps
+
+def select_stages(stages, deps, targets):
+    """Stages needed for `targets` (all if empty), in STAGES order"""
+    names = {stage['name'] for stage in stages}
+    unknown = [target for target in targets if target not in names]
+    if unknown:
+        raise ValueError(f"Unknown stage(s): {', '.join(unknown)} (choose from {', '.join(sorted(names))})")
+    if not targets:
+        return list(stages)
+
+    needed = set()
+    todo = list(targets)
+    while todo:
+        name = todo.pop()
+        if name not in needed:
+            needed.add(name)
+            todo.extend(deps[name])
+    return [stage for stage in stages if stage['name'] in needed]
+
+def stale_reason(stage, max_age_days=DOWNLOAD_MAX_AGE_DAYS):
+    """Why a stage has to run, None if it is up to date"""
+    output_times = []
+    for output in stage['outputs']:
+        path = file_path(output)
+        if path is None or not path.exists():
+            return f"missing {output if isinstance(output, str) else path.name}"
+        output_times.append(path.stat().st_mtime)
+
+    stamp = stamp_path(stage)
+    if not stage['inputs']:
+        if not max_age_days:
+            return None
+        fetched = stamp.stat().st_mtime if stamp.exists() else min(output_times, default=time.time())
+        age_days = (time.time() - fetched) / 86400
+        if age_days > max_age_days:
+            return f"{age_days:.0f} days old (max age {max_age_days:g})"
+        return None
+
+    if not stamp.exists():
+        return "no previous run"
+    if 'args' in stage and stamp.read_text().splitlines()[1:2] != [json.dumps(stage['args'])]:
+        return "arguments changed"
+    stamp_time = stamp.stat().st_mtime
+    for item in stage['inputs']:
+        path = file_path(item)
+        if path is not None and path.exists() and path.stat().st_mtime > stamp_time:
+            return f"{item if isinstance(item, str) else path.name} changed"
+    return None
+
+def run_stage(stage):
+    """Run one stage action, returns (ok, seconds, error)"""
+    start = time.perf_counter()
+    try:
+        ok = (stage['run'](stage['args']) if 'args' in stage else stage['run']()) is not False
+        error = None if ok else "returned False"
+    except SystemExit as e:
+        ok = not e.code
+        error = None if ok else f"exit {e.code}"
+    except Exception as e:
+        traceback.print_exc()
+        ok = False
+        error = f"{type(e).__name__}: {e}"
+    elapsed = time.perf_counter() - start
+    if ok:
+        STAMP_DIR.mkdir(parents=True, exist_ok=True)
+        stamp_path(stage).write_text(stamp_text(stage))
+    return ok, elapsed, error
+
+def run_pipeline(stages, force=False, dry_run=False, workers=PIPELINE_WORKERS,
+                 max_age_days=DOWNLOAD_MAX_AGE_DAYS):
+    """
+    Run `stages` in dependency order, up to `workers` at a time.
+
+    Returns:
+        {stage name: (status, seconds, note)} in completion order; status is
+        one of ran, skipped, failed, blocked (or would run with dry_run)
+    """
+    deps = stage_dependencies(STAGES)
+    by_name = {stage['name']: stage for stage in stages}
+    pending = [stage['name'] for stage in stages]
+    results = {}
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while pending or running:
+            progressed = True
+            while progressed:
+                progressed = False
+                for name in list(pending):
+                    stage_deps = [dep for dep in deps[name] if dep in by_name]
+                    if any(dep not in results for dep in stage_deps):
+                        continue
+                    pending.remove(name)
+                    progressed = True
+                    broken = [dep for dep in stage_deps if results[dep][0] in ('failed', 'blocked')]
+                    upstream = [dep for dep in stage_deps if results[dep][0] == 'would run']
+                    if broken:
+                        results[name] = ('blocked', 0.0, f"after {', '.join(broken)}")
+                        continue
+                    reason = "forced" if force else stale_reason(by_name[name], max_age_days)
+                    if reason is None and upstream:
+                        reason = f"after {', '.join(upstream)}"
+                    if reason is None:
+                        results[name] = ('skipped', 0.0, "up to date")
+                    elif dry_run:
+                        results[name] = ('would run', 0.0, reason)
+                    else:
+                        print(f"\n>>> Stage {name}: {reason}", flush=True)
+                        running[executor.submit(run_stage, by_name[name])] = (name, reason)
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, reason = running.pop(future)
+                ok, elapsed, error = future.result()
+                results[name] = ('ran', elapsed, reason) if ok else ('failed', elapsed, error)
+                print(f"<<< Stage {name}: {'done' if ok else 'FAILED'} in {elapsed:.1f}s", flush=True)
+    return results
+
+def print_timing_report(results, wall_time):
+    print("\n" + "-" * 72)
+    print(f"{'Stage':<18}{'Status':<11}{'Seconds':>9}  Note")
+    print("-" * 72)
+    for name, (status, seconds, note) in results.items():
+        print(f"{name:<18}{status:<11}{seconds:>9.1f}  {note or ''}")
+    print("-" * 72)
+    busy = sum(seconds for _, seconds, _ in results.values())
+    print(f"Wall time {wall_time:.1f}s, stage time {busy:.1f}s")
+
+
+def main(argv=None):
+    args = list(sys.argv[1:] if argv is None else argv)
+    generate_args = GENERATE_ARGS
+    if '--' in args:
+        i = args.index('--')
+        generate_args = args[i + 1:]
+        del args[i:]
+
+    parser = argparse.ArgumentParser(
+        description="Run the data pipeline stages (arguments after -- go to generate_database)")
+    parser.add_argument('stages', nargs='*', metavar='stage',
+                        help="stages to run, with their dependencies (default: all)")
+    parser.add_argument('--force', action='store_true',
+                        help="run every selected stage even if it is up to date")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="only report which stages would run and why")
+    parser.add_argument('--list', action='store_true',
+                        help="list the stages, their state and dependencies")
+    parser.add_argument('--workers', type=int, default=PIPELINE_WORKERS,
+                        help=f"stages run at once (default: {PIPELINE_WORKERS})")
+    parser.add_argument('--max-age', type=float, default=DOWNLOAD_MAX_AGE_DAYS, metavar='DAYS',
+                        help=f"refetch downloads older than this (default: {DOWNLOAD_MAX_AGE_DAYS}, 0 = never)")
+    args = parser.parse_args(args)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.max_age < 0:
+        parser.error("--max-age cannot be negative")
+
+    all_stages = with_generate_args(STAGES, generate_args)
+    deps = stage_dependencies(all_stages)
+    if args.list:
+        for stage in all_stages:
+            reason = stale_reason(stage, args.max_age)
+            after = ', '.join(deps[stage['name']]) or '-'
+            print(f"{stage['name']:<18}{reason or 'up to date':<32}after {after}")
+        return 0
+
+    try:
+        stages = select_stages(all_stages, deps, args.stages)
+    except ValueError as e:
+        parser.error(str(e))
+
+    print("=" * 60)
+    print("NIMAZ PRO - DATA PIPELINE" + (" (dry run)" if args.dry_run else ""))
+    print("=" * 60)
+    print(f"Stages: {', '.join(stage['name'] for stage in stages)}")
+
+    start = time.perf_counter()
+    results = run_pipeline(stages, force=args.force, dry_run=args.dry_run, workers=args.workers,
+                           max_age_days=args.max_age)
+    print_timing_report(results, time.perf_counter() - start)
+    if not args.dry_run:
+        http_cache.print_stats()
+    return 1 if any(status in ('failed', 'blocked') for status, _, _ in results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
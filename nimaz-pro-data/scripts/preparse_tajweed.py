@@ -11,10 +11,14 @@ V2 rule codes — each tajweed sub-type gets its own code so the app can
 assign distinct colors matching a standard colour-coded mushaf.
 """
 
+import hashlib
 import json
-import re
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 from pathlib import Path
 
+from json_stream import load_data, resolve_data_path
+
 # ── V2 Rule Code Map ──────────────────────────────────────────────────
 # Every class from the Quran.com uthmani_tajweed API is mapped to a
 # unique short code.  This lets the Android renderer show a different
@@ -95,19 +99,82 @@ RULE_CODES = {
     'end': None,
 }
 
-# Pattern to match tajweed tags (handles both quoted and unquoted class values)
-TAG_PATTERN = re.compile(r'<tajweed\s+class=(["\']?)([^"\'>\s]+)\1>(.*?)</tajweed>')
+# Bump when preparse_tajweed() output changes for the same input, so that
+# cached segments (see load_cache) are invalidated along with RULE_CODES edits.
+# v2: single-pass tokenizer, nested tags no longer leak markup into text.
+PARSER_VERSION = 2
 
-# Pattern to match span end markers (verse numbers)
-END_SPAN_PATTERN = re.compile(r'<span\s+class=end>.*?</span>')
+_QUOTES = '"\''
 
 
-def preparse_tajweed(html_text):
+def _tajweed_tag_class(head):
+    """
+    Class value of a `tajweed class=value` / `tajweed class="value"` tag
+    body (the text between '<' and '>'), or None if it is not one.
+    """
+    rest = head[7:]
+    if not head.startswith('tajweed') or not rest[:1].isspace():
+        return None
+    rest = rest.lstrip()
+    if not rest.startswith('class='):
+        return None
+    value = rest[6:]
+    quote = value[:1] if value[:1] in _QUOTES else ''
+    if quote:
+        if len(value) < 3 or not value.endswith(quote):
+            return None
+        value = value[1:-1]
+    if not value or any(c in _QUOTES or c.isspace() for c in value):
+        return None
+    return value
+
+
+def _is_end_span(head):
+    """True for a `span class=end` tag body (verse number marker)"""
+    rest = head[4:]
+    return head.startswith('span') and rest[:1].isspace() and rest.lstrip() == 'class=end'
+
+
+# Tag body -> rule code for bodies already seen, so the hot path is a
+# single dict lookup.  Unknown classes are not cached so every hit is counted.
+_NOT_A_TAG = object()
+_END_SPAN = object()
+_HEAD_CODES = {}
+
+
+def _classify_head(head, unknown_classes):
+    """Resolve a tag body to a rule code, _END_SPAN or _NOT_A_TAG"""
+    if _is_end_span(head):
+        _HEAD_CODES[head] = _END_SPAN
+        return _END_SPAN
+    rule_class = _tajweed_tag_class(head)
+    if rule_class is None:
+        _HEAD_CODES[head] = _NOT_A_TAG
+        return _NOT_A_TAG
+
+    rule_class = rule_class.lower()
+    if rule_class in RULE_CODES:
+        _HEAD_CODES[head] = RULE_CODES[rule_class]
+        return RULE_CODES[rule_class]
+    # Unknown rule - try first letter as fallback
+    if unknown_classes is not None:
+        unknown_classes[rule_class] = unknown_classes.get(rule_class, 0) + 1
+    return rule_class[0]
+
+
+def preparse_tajweed(html_text, unknown_classes=None):
     """
     Convert HTML tajweed text to simplified JSON segments.
 
+    Single pass over the '<'-delimited pieces of the string: <tajweed
+    class=...> tags may nest (the innermost rule wins), <span class=end>
+    verse markers are dropped with their content, stray </tajweed> tags are
+    dropped, and anything else is kept as literal text.
+
     Args:
         html_text: Text with <tajweed class="rule">text</tajweed> markup
+        unknown_classes: Optional dict, updated with {class: hits} for
+            classes missing from RULE_CODES (see print_unknown_summary)
 
     Returns:
         List of segments: [{"t": "text", "r": "code"}, ...]
@@ -116,53 +183,96 @@ def preparse_tajweed(html_text):
     if not html_text:
         return []
 
-    # Remove end span markers (verse numbers) - they're not needed in the parsed format
-    html_text = END_SPAN_PATTERN.sub('', html_text).strip()
-
+    pieces = html_text.split('<')
     segments = []
-    last_end = 0
-
-    for match in TAG_PATTERN.finditer(html_text):
-        # Add plain text before this match
-        if match.start() > last_end:
-            plain = html_text[last_end:match.start()]
-            if plain:
-                segments.append({"t": plain, "r": None})
-
-        # Get rule class and text content
-        rule_class = match.group(2).lower()
-        text_content = match.group(3)
-
-        # Map to single-letter code
-        rule_code = RULE_CODES.get(rule_class)
-        if rule_code is None and rule_class not in RULE_CODES:
-            # Unknown rule - try first letter as fallback
-            print(f"Warning: Unknown tajweed class '{rule_class}', using first letter")
-            rule_code = rule_class[0] if rule_class else None
-
-        if text_content:
-            # Only add segment with rule if there's a valid rule code
-            # For 'end' class (verse markers), rule_code will be None
-            segments.append({"t": text_content, "r": rule_code})
-
-        last_end = match.end()
-
-    # Add remaining plain text
-    if last_end < len(html_text):
-        remaining = html_text[last_end:].strip()
-        if remaining:
-            segments.append({"t": remaining, "r": None})
+    rules = []              # stack of rule codes for open <tajweed> tags
+    text = pieces[0]        # text since the last tag
+    seen_tag = False
+    span_text = None        # raw text inside an open <span class=end> marker
+
+    for piece in islice(pieces, 1, None):
+        if span_text is not None:
+            if piece.startswith('/span>'):
+                # Verse number marker - not needed in the parsed format
+                span_text = None
+                text += piece[6:]
+            else:
+                span_text += '<' + piece
+            continue
+
+        if piece.startswith('/tajweed>'):
+            if rules:
+                rule = rules.pop()
+                if not seen_tag:
+                    text = text.lstrip()
+                    seen_tag = True
+                if text:
+                    segments.append({"t": text, "r": rule})
+                text = piece[9:]
+            else:
+                text += piece[9:]
+            continue
+
+        gt = piece.find('>')
+        if gt != -1:
+            head = piece[:gt]
+            code = _HEAD_CODES.get(head, _NOT_A_TAG)
+            if code is _NOT_A_TAG and head not in _HEAD_CODES:
+                code = _classify_head(head, unknown_classes)
+            if code is _END_SPAN:
+                span_text = '<' + piece
+                continue
+            if code is not _NOT_A_TAG:
+                if not seen_tag:
+                    # The whole (marker-free) string is stripped, as before
+                    text = text.lstrip()
+                    seen_tag = True
+                if text:
+                    segments.append({"t": text, "r": rules[-1] if rules else None})
+                rules.append(code)
+                text = piece[gt + 1:]
+                continue
+
+        text += '<' + piece
+
+    if span_text is not None:
+        # Unterminated marker: keep it as literal text
+        text += span_text
+
+    # Trailing text: inside an unclosed tag it keeps its rule, otherwise it is
+    # stripped on both sides like the old remaining-text handling
+    if rules:
+        if not seen_tag:
+            text = text.lstrip()
+        if text:
+            segments.append({"t": text, "r": rules[-1]})
+    else:
+        text = text.strip()
+        if text:
+            segments.append({"t": text, "r": None})
 
     return segments
 
 
+def print_unknown_summary(unknown_classes):
+    """Print one warning line summarising unknown tajweed classes"""
+    if unknown_classes:
+        summary = ', '.join(f"{name} ({count})" for name, count in
+                            sorted(unknown_classes.items(), key=lambda item: -item[1]))
+        print(f"Warning: Unknown tajweed classes (first letter used as code): {summary}")
+
+
 def preparse_tajweed_file(input_path, output_path=None):
     """
-    Pre-parse an entire tajweed.json file.
+    Pre-parse an entire tajweed.json file into the segment cache.
 
     Args:
-        input_path: Path to tajweed.json (dict with "surah:ayah" keys)
-        output_path: Optional output path (defaults to tajweed_parsed.json)
+        input_path: Path to tajweed.json (dict with "surah:ayah" keys, in
+            any json_stream format)
+        output_path: Optional cache path (defaults to tajweed_parsed.json)
+
+    Returns:
+        Dict mapping "surah:ayah" to segments JSON string
     """
     input_path = Path(input_path)
     if output_path is None:
@@ -171,39 +281,150 @@ def preparse_tajweed_file(input_path, output_path=None):
         output_path = Path(output_path)
 
     print(f"Loading tajweed data from {input_path}...")
-    with open(input_path, 'r', encoding='utf-8') as f:
-        tajweed_data = json.load(f)
+    tajweed_data = load_data(input_path.parent, input_path.name)
 
-    print(f"Pre-parsing {len(tajweed_data)} entries...")
-    parsed_data = {}
-    for key, html_text in tajweed_data.items():
-        segments = preparse_tajweed(html_text)
-        # Store as JSON string for direct insertion into database
-        parsed_data[key] = json.dumps(segments, ensure_ascii=False)
+    cache = load_cache(output_path)
+    parsed_data, misses = split_cached(tajweed_data, cache)
+    print(f"Pre-parsing {len(misses)} entries ({len(parsed_data)} unchanged in cache)...")
+    unknown_classes = {}
+    for key, html_text in misses.items():
+        parsed_data[key] = preparse_single(html_text, unknown_classes)
+    print_unknown_summary(unknown_classes)
 
-    print(f"Writing parsed data to {output_path}...")
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(parsed_data, f, ensure_ascii=False, indent=2)
+    print(f"Writing segment cache to {output_path}...")
+    save_cache(output_path, tajweed_data, parsed_data)
 
     print(f"Done! Parsed {len(parsed_data)} ayahs")
-    return parsed_data
+    return {key: parsed_data[key] for key in tajweed_data}
 
 
-def preparse_single(html_text):
+def preparse_single(html_text, unknown_classes=None):
     """
     Pre-parse a single HTML tajweed string and return JSON string.
     Used by generate_database.py for inline conversion.
     """
-    segments = preparse_tajweed(html_text)
+    segments = preparse_tajweed(html_text, unknown_classes)
     return json.dumps(segments, ensure_ascii=False)
 
 
+# ── Segment cache ─────────────────────────────────────────────────────
+# tajweed_parsed.json persists parsed segments between runs, keyed by a
+# hash of each ayah's raw HTML:
+#   {"rules_version": "...", "segments": {"<sha1 of html>": "<segments JSON>"}}
+# A different rules_version (RULE_CODES or PARSER_VERSION changed) discards
+# the whole cache.
+
+def rules_version():
+    """Fingerprint of the rule map and parser that produced cached segments"""
+    payload = json.dumps({"codes": RULE_CODES, "parser": PARSER_VERSION}, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def content_hash(html_text):
+    return hashlib.sha1(html_text.encode('utf-8')).hexdigest()
+
+
+def load_cache(cache_path):
+    """Load cached {html hash: segments JSON}, or {} if missing or stale"""
+    cache_path = Path(cache_path)
+    if not cache_path.exists():
+        return {}
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("rules_version") != rules_version():
+        return {}
+    return data.get("segments", {})
+
+
+def split_cached(tajweed_data, cache):
+    """
+    Separate entries whose HTML is already parsed in the cache.
+
+    Returns:
+        (hits {key: segments JSON}, misses {key: html})
+    """
+    hits = {}
+    misses = {}
+    for key, html_text in tajweed_data.items():
+        segments = cache.get(content_hash(html_text))
+        if segments is None:
+            misses[key] = html_text
+        else:
+            hits[key] = segments
+    return hits, misses
+
+
+def save_cache(cache_path, tajweed_data, parsed):
+    """Write the cache for the current input, dropping entries no longer used"""
+    segments = {content_hash(tajweed_data[key]): value for key, value in parsed.items()}
+    with open(cache_path, 'w', encoding='utf-8') as f:
+        json.dump({"rules_version": rules_version(), "segments": segments},
+                  f, ensure_ascii=False, separators=(',', ':'))
+
+
+# Ayahs per task sent to a worker process; large enough to amortise pickling
+PARALLEL_CHUNK_SIZE = 500
+
+
+def _preparse_chunk(items):
+    """Worker task: pre-parse a list of (key, html) pairs, plus unknown class counts"""
+    unknown_classes = {}
+    parsed = [(key, preparse_single(html_text, unknown_classes)) for key, html_text in items]
+    return parsed, unknown_classes
+
+
+def submit_preparse(executor, tajweed_data, chunk_size=PARALLEL_CHUNK_SIZE):
+    """
+    Fan tajweed entries out to an executor in chunks of ayah keys.
+
+    Empty entries are skipped, matching the serial path which stores NULL
+    for them.  Returns the list of futures in key order; pass it to
+    collect_preparse() to merge the results.
+    """
+    items = iter([(key, html) for key, html in tajweed_data.items() if html])
+    futures = []
+    while True:
+        chunk = list(islice(items, chunk_size))
+        if not chunk:
+            return futures
+        futures.append(executor.submit(_preparse_chunk, chunk))
+
+
+def collect_preparse(futures, unknown_classes=None):
+    """
+    Merge chunk results back into a {key: json string} dict in key order.
+
+    Unknown class counts from the workers are added to unknown_classes if given.
+    """
+    parsed = {}
+    for future in futures:
+        chunk, chunk_unknown = future.result()
+        parsed.update(chunk)
+        if unknown_classes is not None:
+            for name, count in chunk_unknown.items():
+                unknown_classes[name] = unknown_classes.get(name, 0) + count
+    return parsed
+
+
+def preparse_parallel(tajweed_data, workers=None, chunk_size=PARALLEL_CHUNK_SIZE):
+    """
+    Pre-parse a whole {"surah:ayah": html} mapping across worker processes.
+
+    Output is identical to calling preparse_single() on each entry in turn.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return collect_preparse(submit_preparse(executor, tajweed_data, chunk_size))
+
+
 if __name__ == "__main__":
     # Run standalone to pre-parse the entire tajweed.json file
     json_dir = Path(__file__).parent.parent / "json"
     tajweed_path = json_dir / "tajweed.json"
 
-    if tajweed_path.exists():
-        preparse_tajweed_file(tajweed_path)
-    else:
+    if resolve_data_path(json_dir, tajweed_path.name) is None:
         print(f"Error: {tajweed_path} not found")
+    else:
+        preparse_tajweed_file(tajweed_path)
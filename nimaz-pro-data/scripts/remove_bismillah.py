@@ -10,10 +10,11 @@ Exceptions:
 - Surah 9 (At-Tawbah): Has no Bismillah at all
 """
 
-import json
 import unicodedata
 from pathlib import Path
 
+from json_stream import load_data, save_data
+
 # The exact Bismillah text as it appears in the ayahs.json data (38 characters)
 # Extracted directly from Surah 2, Ayah 1
 BISMILLAH = 'بِسْمِ ٱللَّهِ ٱلرَّحْمَٰنِ ٱلرَّحِيمِ'
@@ -27,7 +28,8 @@ def remove_bismillah_from_ayahs(ayahs_path=None):
     Remove Bismillah from the first ayah of surahs 2-8 and 10-114.
 
     Args:
-        ayahs_path: Path to ayahs.json (optional, defaults to ../json/ayahs.json)
+        ayahs_path: Path to ayahs.json (optional, defaults to ../json/ayahs.json);
+            any json_stream format of that file is read
     """
     if ayahs_path is None:
         ayahs_path = Path(__file__).parent.parent / "json" / "ayahs.json"
@@ -35,8 +37,7 @@ def remove_bismillah_from_ayahs(ayahs_path=None):
         ayahs_path = Path(ayahs_path)
 
     print(f"Loading ayahs from {ayahs_path}...")
-    with open(ayahs_path, 'r', encoding='utf-8') as f:
-        ayahs = json.load(f)
+    ayahs = load_data(ayahs_path.parent, ayahs_path.name)
 
     modified_count = 0
     skipped_surahs = []
@@ -87,8 +88,7 @@ def remove_bismillah_from_ayahs(ayahs_path=None):
 
     # Save modified ayahs
     print(f"\nSaving modified ayahs to {ayahs_path}...")
-    with open(ayahs_path, 'w', encoding='utf-8') as f:
-        json.dump(ayahs, f, ensure_ascii=False, indent=2)
+    save_data(ayahs_path.parent, ayahs_path.name, ayahs)
 
     print(f"\nDone! Modified {modified_count} fields")
 
@@ -109,8 +109,7 @@ def verify_bismillah_removal(ayahs_path=None):
     else:
         ayahs_path = Path(ayahs_path)
 
-    with open(ayahs_path, 'r', encoding='utf-8') as f:
-        ayahs = json.load(f)
+    ayahs = load_data(ayahs_path.parent, ayahs_path.name)
 
     print("Verifying first ayah of each surah:")
     issues = []
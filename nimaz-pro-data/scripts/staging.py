@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Typed staging store between the downloaders and the database generator.
+
+The large datasets (ayahs, translations, hadith collections, tafseers)
+are kept in json/staging.db as one typed table per data file, columns in
+the order the generator inserts them.  generate_database ATTACHes the
+store and fills its tables with INSERT ... SELECT, so those rows are never
+decoded into per-row dicts or re-keyed by field name.
+
+Each staged table is tagged in `staged_files` with the SHA-1 of the data
+file it was built from (and STAGE_VERSION); a stage whose file has since
+changed is stale and is rebuilt from the file.  The downloaders stage
+their in-memory records right after saving (stage_data), and the
+generator restages anything stale before loading (refresh_staging).
+
+Run standalone to (re)stage every stageable file in json/.
+"""
+
+import hashlib
+import sqlite3
+import time
+from fnmatch import fnmatch
+from itertools import islice
+from pathlib import Path
+
+from json_stream import iter_records, resolve_data_path
+
+STAGING_FILENAME = "staging.db"
+# Bump when STAGE_SCHEMAS changes to invalidate existing stages
+STAGE_VERSION = 1
+STAGE_BATCH_SIZE = 5000
+
+# Data file pattern -> staged columns (JSON field, SQLite type), in insert order
+STAGE_SCHEMAS = {
+    'ayahs.json': [
+        ('id', 'INTEGER'), ('surah_id', 'INTEGER'), ('number_in_surah', 'INTEGER'),
+        ('number_global', 'INTEGER'), ('text_arabic', 'TEXT'), ('text_uthmani', 'TEXT'),
+        ('juz', 'INTEGER'), ('hizb', 'INTEGER'), ('page', 'INTEGER'), ('sajda', 'INTEGER'),
+        ('sajda_type', 'TEXT'),
+    ],
+    'translations.json': [('ayah_id', 'INTEGER'), ('translator_id', 'TEXT'), ('text', 'TEXT')],
+    'hadith_*.json': [
+        ('id', 'INTEGER'), ('book_id', 'INTEGER'), ('chapter_id', 'INTEGER'),
+        ('number_in_book', 'INTEGER'), ('number_in_chapter', 'INTEGER'), ('text_arabic', 'TEXT'),
+        ('text_english', 'TEXT'), ('narrator', 'TEXT'), ('grade', 'TEXT'), ('reference', 'TEXT'),
+    ],
+    'tafseer_*.json': [
+        ('ayah_id', 'INTEGER'), ('surah_number', 'INTEGER'), ('ayah_number', 'INTEGER'), ('text', 'TEXT'),
+    ],
+}
+# Matched by a pattern above but not a stageable dataset
+STAGE_EXCLUDE = {'hadith_books.json'}
+
+
+def staging_path(json_dir):
+    return Path(json_dir) / STAGING_FILENAME
+
+
+def file_fingerprint(path):
+    """SHA-1 of a file's bytes, None if it does not exist"""
+    if path is None or not Path(path).exists():
+        return None
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def stage_schema(filename):
+    """Staged columns for a logical data file name, None if it is not staged"""
+    if filename in STAGE_EXCLUDE:
+        return None
+    for pattern, columns in STAGE_SCHEMAS.items():
+        if fnmatch(filename, pattern):
+            return columns
+    return None
+
+
+def stage_table(filename):
+    """Name of the staged table for a data file (hadith_bukhari.json -> stage_hadith_bukhari)"""
+    return "stage_" + Path(filename).stem
+
+
+def open_staging(json_dir):
+    conn = sqlite3.connect(staging_path(json_dir))
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS staged_files (
+            filename TEXT NOT NULL PRIMARY KEY,
+            fingerprint TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            rows INTEGER NOT NULL,
+            staged_at REAL NOT NULL
+        )
+    ''')
+    return conn
+
+
+def write_stage(conn, filename, records, fingerprint):
+    """Replace the staged table of one data file with `records`, returns the row count"""
+    columns = stage_schema(filename)
+    table = stage_table(filename)
+    fields = [name for name, _ in columns]
+    conn.execute(f"DROP TABLE IF EXISTS {table}")
+    conn.execute(f"CREATE TABLE {table} ({', '.join(f'{name} {kind}' for name, kind in columns)})")
+
+    sql = f"INSERT INTO {table} VALUES ({', '.join('?' * len(fields))})"
+    rows = (tuple(record.get(field) for field in fields) for record in records)
+    count = 0
+    while True:
+        batch = list(islice(rows, STAGE_BATCH_SIZE))
+        if not batch:
+            break
+        conn.executemany(sql, batch)
+        count += len(batch)
+    conn.execute("INSERT OR REPLACE INTO staged_files VALUES (?,?,?,?,?)",
+                 (filename, fingerprint, STAGE_VERSION, count, time.time()))
+    conn.commit()
+    return count
+
+
+def stage_data(json_dir, filename, records):
+    """
+    Stage records a downloader has just saved with json_stream.save_data.
+    Does nothing for data files without a STAGE_SCHEMAS entry.
+    """
+    if stage_schema(filename) is None:
+        return
+    fingerprint = file_fingerprint(resolve_data_path(json_dir, filename))
+    conn = open_staging(json_dir)
+    try:
+        write_stage(conn, filename, records, fingerprint)
+    finally:
+        conn.close()
+
+
+def is_fresh(conn, filename, fingerprint):
+    row = conn.execute("SELECT fingerprint, version FROM staged_files WHERE filename = ?",
+                       (filename,)).fetchone()
+    return row is not None and fingerprint is not None and row == (fingerprint, STAGE_VERSION)
+
+
+def refresh_staging(json_dir, filenames):
+    """
+    Make sure every stageable file in `filenames` has a fresh stage,
+    restaging stale or missing ones from the data file.
+
+    Returns:
+        Set of file names whose staged table can be used
+    """
+    ready = set()
+    conn = open_staging(json_dir)
+    try:
+        for filename in filenames:
+            if stage_schema(filename) is None:
+                continue
+            path = resolve_data_path(json_dir, filename)
+            if path is None:
+                continue
+            fingerprint = file_fingerprint(path)
+            if not is_fresh(conn, filename, fingerprint):
+                start = time.perf_counter()
+                count = write_stage(conn, filename, iter_records(json_dir, filename), fingerprint)
+                print(f"  Staged {filename:<32}{count:>8} rows{time.perf_counter() - start:>9.3f}s")
+            ready.add(filename)
+    finally:
+        conn.close()
+    return ready
+
+
+if __name__ == "__main__":
+    json_dir = Path(__file__).parent.parent / "json"
+    filenames = sorted({p.with_suffix('.json').name for p in json_dir.iterdir()
+                        if p.suffix in ('.json', '.jsonl', '.msgpack')})
+    print(f"Refreshing {staging_path(json_dir)}...")
+    ready = refresh_staging(json_dir, filenames)
+    print(f"{len(ready)} data files staged")
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Compact binary encoding for pre-parsed tajweed segments.
+
+preparse_single() emits segments as JSON, e.g.
+    [{"t": "ٱ", "r": "hw"}, {"t": "للَّهِ ", "r": null}, ...]
+which repeats the "t"/"r" keys and null rules for every segment.  This
+codec stores the same information as run-length spans over the ayah text:
+
+    byte 0      flags (bit 0: base text embedded)
+    [varint n + n bytes UTF-8]   base text, only when flag bit 0 is set
+    repeated:   rule byte, varint span length (in code points)
+
+The base text is the concatenation of all segment texts.  When it equals
+ayahs.text_uthmani it is not embedded and the decoder takes it from that
+column; otherwise (quran.com and Tanzil differ on tatweel etc.) it is
+embedded.  All Quranic text is in the BMP, so code point lengths equal
+UTF-16 char counts on the Android side.
+
+Rule bytes index RULE_BYTES (0 = plain text).  A rule code outside the
+table (preparse_tajweed's first-letter fallback for unknown classes) is
+written as ESCAPE_RULE followed by a varint-length UTF-8 code.
+
+Run standalone to round-trip every ayah and print a size report.
+"""
+
+import json
+from pathlib import Path
+
+from json_stream import load_data
+from preparse_tajweed import RULE_CODES, preparse_tajweed
+
+# Byte value -> rule code, in RULE_CODES order of first appearance
+RULE_BYTES = [None] + list(dict.fromkeys(code for code in RULE_CODES.values() if code is not None))
+RULE_TO_BYTE = {code: index for index, code in enumerate(RULE_BYTES)}
+ESCAPE_RULE = 0xFF
+
+FLAG_EMBEDDED_TEXT = 0x01
+
+
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, pos):
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def encode_segments(segments, text_uthmani=None):
+    """
+    Encode a segment list as spans.
+
+    Args:
+        segments: List of {"t": text, "r": code or None}
+        text_uthmani: The ayah's text_uthmani; the base text is embedded
+            unless it matches exactly
+
+    Returns:
+        bytes
+    """
+    base_text = ''.join(segment['t'] for segment in segments)
+    out = bytearray()
+    if base_text == text_uthmani:
+        out.append(0)
+    else:
+        out.append(FLAG_EMBEDDED_TEXT)
+        encoded = base_text.encode('utf-8')
+        _write_varint(out, len(encoded))
+        out += encoded
+
+    for segment in segments:
+        rule = segment['r']
+        rule_byte = RULE_TO_BYTE.get(rule)
+        if rule_byte is None:
+            out.append(ESCAPE_RULE)
+            encoded = rule.encode('utf-8')
+            _write_varint(out, len(encoded))
+            out += encoded
+        else:
+            out.append(rule_byte)
+        _write_varint(out, len(segment['t']))
+    return bytes(out)
+
+
+def decode_segments(data, text_uthmani=None):
+    """
+    Decode spans back into the segment list produced by preparse_tajweed().
+
+    Args:
+        data: Encoded bytes
+        text_uthmani: The ayah's text_uthmani (required unless embedded)
+    """
+    pos = 1
+    if data[0] & FLAG_EMBEDDED_TEXT:
+        length, pos = _read_varint(data, pos)
+        base_text = data[pos:pos + length].decode('utf-8')
+        pos += length
+    elif text_uthmani is None:
+        raise ValueError("Spans reference text_uthmani but none was given")
+    else:
+        base_text = text_uthmani
+
+    segments = []
+    offset = 0
+    while pos < len(data):
+        rule_byte = data[pos]
+        pos += 1
+        if rule_byte == ESCAPE_RULE:
+            length, pos = _read_varint(data, pos)
+            rule = data[pos:pos + length].decode('utf-8')
+            pos += length
+        else:
+            rule = RULE_BYTES[rule_byte]
+        length, pos = _read_varint(data, pos)
+        segments.append({"t": base_text[offset:offset + length], "r": rule})
+        offset += length
+    return segments
+
+
+def decode_to_json(data, text_uthmani=None):
+    """Decode spans to the exact JSON string preparse_single() would produce"""
+    return json.dumps(decode_segments(data, text_uthmani), ensure_ascii=False)
+
+
+def pack_spans(blobs):
+    """Concatenate encoded span blobs, each prefixed with its varint length"""
+    out = bytearray()
+    for blob in blobs:
+        _write_varint(out, len(blob))
+        out += blob
+    return bytes(out)
+
+
+def unpack_spans(data):
+    """Split a pack_spans() payload back into the individual blobs"""
+    blobs = []
+    pos = 0
+    while pos < len(data):
+        length, pos = _read_varint(data, pos)
+        blobs.append(data[pos:pos + length])
+        pos += length
+    return blobs
+
+
+def size_report(json_sizes, binary_sizes):
+    """Print total and average sizes of the JSON and binary encodings"""
+    count = len(json_sizes)
+    json_total = sum(json_sizes)
+    binary_total = sum(binary_sizes)
+    print(f"Tajweed encoding size ({count} ayahs):")
+    print(f"  JSON:   {json_total / 1024:>10,.1f} KB  ({json_total / max(count, 1):.0f} B/ayah)")
+    print(f"  Binary: {binary_total / 1024:>10,.1f} KB  ({binary_total / max(count, 1):.0f} B/ayah)")
+    if json_total:
+        print(f"  Saved:  {(json_total - binary_total) / 1024:>10,.1f} KB  "
+              f"({100 * (1 - binary_total / json_total):.1f}%)")
+
+
+if __name__ == "__main__":
+    json_dir = Path(__file__).parent.parent / "json"
+    tajweed_data = load_data(json_dir, "tajweed.json")
+    uthmani = {f"{a['surah_id']}:{a['number_in_surah']}": a['text_uthmani']
+               for a in load_data(json_dir, "ayahs.json")}
+
+    json_sizes, binary_sizes = [], []
+    embedded = 0
+    for key, html_text in tajweed_data.items():
+        segments = preparse_tajweed(html_text)
+        as_json = json.dumps(segments, ensure_ascii=False)
+        encoded = encode_segments(segments, uthmani.get(key))
+        if decode_to_json(encoded, uthmani.get(key)) != as_json:
+            raise SystemExit(f"Round-trip mismatch for {key}")
+        embedded += encoded[0] & FLAG_EMBEDDED_TEXT
+        json_sizes.append(len(as_json.encode('utf-8')))
+        binary_sizes.append(len(encoded))
+
+    print(f"Round-trip OK for {len(json_sizes)} ayahs ({embedded} with embedded base text)")
+    size_report(json_sizes, binary_sizes)
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Dictionary compression for the long prose columns.
+
+Tafseer and hadith texts are most of the database, and they are highly
+repetitive ("Allah's Messenger said", "narrated ... that ...").  Rows
+are short, so compressing each one on its own gains little; with a shared
+dictionary trained on the corpus the compressor can reference those
+phrases from the first byte of every row.
+
+generate_database --compress-text stores, per corpus in CORPORA:
+
+    text_dictionaries (corpus PK, codec, dictionary BLOB)
+    <table>_compressed (id PK, <column> BLOB, ...)
+
+and empties the original TEXT columns (Room still sees its schema).  Codecs:
+
+    zlib   raw deflate (no header) with a preset dictionary of frequent
+           phrases built by train_dictionary(); readable on Android with
+           java.util.zip.Inflater(true) + setDictionary()
+    zstd   zstd with a trained dictionary, when the `zstandard` package is
+           installed (the app needs a native zstd library to read it)
+
+Run standalone on a database built with --compress-text to verify every
+row and benchmark decompression latency against the space saved.
+
+Usage:
+    python text_codec.py [db path] [--sample N]
+"""
+
+import argparse
+import sqlite3
+import time
+import zlib
+from collections import Counter
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DB_FILE = Path(__file__).parent.parent / "output" / "nimaz_prepopulated.db"
+
+CODECS = ['zlib', 'zstd']
+DEFAULT_CODEC = 'zlib'
+
+# corpus -> (table, column); each corpus gets its own dictionary
+CORPORA = {
+    'tafseer': ('tafseer_texts', 'text'),
+    'hadith_english': ('hadiths', 'text_english'),
+    'hadith_arabic': ('hadiths', 'text_arabic'),
+}
+
+# zlib can reference at most 32 KB back, so a longer dictionary is wasted
+ZLIB_DICT_SIZE = 32 * 1024
+ZSTD_DICT_SIZE = 112 * 1024
+# Text sampled for training (every n-th row up to this many bytes)
+TRAINING_BYTES = 4 * 1024 * 1024
+# Word n-gram lengths considered for the zlib dictionary
+PHRASE_WORDS = (2, 4, 8)
+ZLIB_LEVEL = 9
+ZSTD_LEVEL = 19
+
+
+def compressed_table(table):
+    """Side table holding the compressed columns of a content table"""
+    return f"{table}_compressed"
+
+
+def table_corpora(table):
+    """Corpora stored in one content table, in CORPORA order"""
+    return [corpus for corpus, (corpus_table, _) in CORPORA.items() if corpus_table == table]
+
+
+def codec_available(codec):
+    return codec == 'zlib' or (codec == 'zstd' and zstandard is not None)
+
+
+def training_sample(texts, limit=TRAINING_BYTES):
+    """Evenly spaced texts totalling at most `limit` UTF-8 bytes"""
+    total = sum(len(text.encode('utf-8')) for text in texts)
+    step = max(1, total // limit)
+    sample = []
+    size = 0
+    for text in texts[::step]:
+        size += len(text.encode('utf-8'))
+        if size > limit:
+            break
+        sample.append(text)
+    return sample
+
+
+def _phrase_dictionary(texts, size):
+    """
+    Preset dictionary for deflate: frequent word n-grams, scored by
+    (occurrences - 1) * length, best last (deflate prefers near matches).
+    """
+    counts = Counter()
+    for text in texts:
+        words = text.split(' ')
+        for n in PHRASE_WORDS:
+            for i in range(len(words) - n + 1):
+                counts[' '.join(words[i:i + n]) + ' '] += 1
+
+    ranked = sorted(((count - 1) * len(phrase.encode('utf-8')), phrase)
+                    for phrase, count in counts.items() if count > 1)
+    chosen = []
+    used = 0
+    for _, phrase in reversed(ranked):
+        encoded = phrase.encode('utf-8')
+        if used + len(encoded) > size:
+            continue
+        if any(phrase in other for other in chosen):
+            continue
+        chosen.append(phrase)
+        used += len(encoded)
+        if used >= size - 16:
+            break
+    return ''.join(reversed(chosen)).encode('utf-8')
+
+
+def train_dictionary(texts, codec=DEFAULT_CODEC):
+    """Build a compression dictionary for a corpus of strings"""
+    sample = training_sample([text for text in texts if text])
+    if not sample:
+        return b''
+    if codec == 'zstd':
+        samples = [text.encode('utf-8') for text in sample]
+        return zstandard.train_dictionary(ZSTD_DICT_SIZE, samples).as_bytes()
+    return _phrase_dictionary(sample, ZLIB_DICT_SIZE)
+
+
+class TextCompressor:
+    """Compress strings with one corpus dictionary"""
+
+    def __init__(self, codec, dictionary):
+        self.codec = codec
+        self.dictionary = dictionary
+        if codec == 'zstd':
+            self._zstd = zstandard.ZstdCompressor(
+                level=ZSTD_LEVEL, dict_data=zstandard.ZstdCompressionDict(dictionary),
+                write_content_size=True, write_checksum=False, write_dict_id=False)
+
+    def compress(self, text):
+        data = text.encode('utf-8')
+        if self.codec == 'zstd':
+            return self._zstd.compress(data)
+        if self.dictionary:
+            compressor = zlib.compressobj(ZLIB_LEVEL, zlib.DEFLATED, -15, zdict=self.dictionary)
+        else:
+            compressor = zlib.compressobj(ZLIB_LEVEL, zlib.DEFLATED, -15)
+        return compressor.compress(data) + compressor.flush()
+
+
+class TextDecompressor:
+    """Decompress blobs written by TextCompressor"""
+
+    def __init__(self, codec, dictionary):
+        self.codec = codec
+        self.dictionary = dictionary
+        if codec == 'zstd':
+            if zstandard is None:
+                raise RuntimeError("zstd-compressed text needs the zstandard package")
+            self._zstd = zstandard.ZstdDecompressor(dict_data=zstandard.ZstdCompressionDict(dictionary))
+
+    def decompress(self, blob):
+        if blob is None:
+            return None
+        if self.codec == 'zstd':
+            return self._zstd.decompress(blob).decode('utf-8')
+        if self.dictionary:
+            decompressor = zlib.decompressobj(-15, zdict=self.dictionary)
+        else:
+            decompressor = zlib.decompressobj(-15)
+        return (decompressor.decompress(blob) + decompressor.flush()).decode('utf-8')
+
+
+def load_decompressors(conn):
+    """corpus -> TextDecompressor for every dictionary in the database"""
+    return {corpus: TextDecompressor(codec, dictionary)
+            for corpus, codec, dictionary in conn.execute(
+                "SELECT corpus, codec, dictionary FROM text_dictionaries")}
+
+
+def read_text(conn, corpus, row_id, decompressors=None):
+    """
+    Read one compressed text.
+
+    Args:
+        corpus: Key of CORPORA, e.g. 'tafseer'
+        decompressors: From load_decompressors(), to avoid reloading the
+            dictionaries per call
+
+    Returns:
+        The original string, or None if the row does not exist
+    """
+    if decompressors is None:
+        decompressors = load_decompressors(conn)
+    table, column = CORPORA[corpus]
+    row = conn.execute(f"SELECT {column} FROM {compressed_table(table)} WHERE id = ?",
+                       (row_id,)).fetchone()
+    return decompressors[corpus].decompress(row[0]) if row else None
+
+
+def benchmark(db_path, sample=2000):
+    """Decode every row per corpus and report space saved vs single-row decode latency"""
+    conn = sqlite3.connect(db_path)
+    decompressors = load_decompressors(conn)
+    if not decompressors:
+        print(f"No text_dictionaries in {db_path} (build with --compress-text)")
+        return
+
+    print(f"{'Corpus':<16}{'Codec':<6}{'Rows':>7}{'Raw MB':>9}{'No dict':>9}{'Dict':>9}"
+          f"{'Dict KB':>9}{'Saved':>8}{'us/row':>8}{'p95 us':>8}")
+    print("-" * 89)
+    for corpus, (table, column) in CORPORA.items():
+        decompressor = decompressors.get(corpus)
+        if decompressor is None:
+            continue
+        blobs = [blob for (blob,) in conn.execute(
+            f"SELECT {column} FROM {compressed_table(table)} ORDER BY id") if blob is not None]
+        if not blobs:
+            continue
+        step = max(1, len(blobs) // sample)
+        raw_bytes = plain_bytes = 0
+        latencies = []
+        plain = TextCompressor(decompressor.codec, b'') if decompressor.codec == 'zlib' else None
+        for blob in blobs:
+            text = decompressor.decompress(blob)
+            encoded = len(text.encode('utf-8'))
+            raw_bytes += encoded
+            if plain is not None:
+                plain_bytes += len(plain.compress(text))
+        for blob in blobs[::step]:
+            start = time.perf_counter()
+            decompressor.decompress(blob)
+            latencies.append(time.perf_counter() - start)
+
+        stored = sum(len(blob) for blob in blobs)
+        latencies.sort()
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        no_dict = f"{plain_bytes / 1024 / 1024:>9.2f}" if plain is not None else f"{'-':>9}"
+        print(f"{corpus:<16}{decompressor.codec:<6}{len(blobs):>7}{raw_bytes / 1024 / 1024:>9.2f}"
+              f"{no_dict}{stored / 1024 / 1024:>9.2f}{len(decompressor.dictionary) / 1024:>9.1f}"
+              f"{100 * (1 - stored / raw_bytes):>7.1f}%"
+              f"{sum(latencies) / len(latencies) * 1e6:>8.1f}{p95 * 1e6:>8.1f}")
+    print("-" * 89)
+    print("Sizes exclude page overhead; latency is a single-row decode (dictionary preloaded)")
+    conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verify and benchmark a database built with --compress-text")
+    parser.add_argument('db_path', nargs='?', type=Path, default=DB_FILE,
+                        help=f"database to check (default: {DB_FILE})")
+    parser.add_argument('--sample', type=int, default=2000,
+                        help="rows per corpus timed for decode latency (default: 2000)")
+    args = parser.parse_args()
+    if args.sample < 1:
+        parser.error("--sample must be at least 1")
+    if not args.db_path.exists():
+        parser.error(f"{args.db_path} not found")
+    benchmark(args.db_path, args.sample)
@@ -2,13 +2,39 @@
 """
 Verify the generated database has all required tables and columns
 """
+import json
 import sqlite3
 from pathlib import Path
 
 DB_FILE = Path(__file__).parent.parent / "output" / "nimaz_prepopulated.db"
 
-def verify_database():
-    conn = sqlite3.connect(DB_FILE)
+# Optional side tables generate_database.py builds, with the build option
+# that asks for them
+GENERATED_TABLES = {
+    'mushaf_pages': 'mushaf_pages',
+    'ayah_search': 'search_tables',
+    'hadith_search': 'search_tables',
+    'name_trigrams': 'name_trigrams',
+}
+
+def build_options(db_path):
+    """Options recorded in the database's build manifest ({} if it has none)"""
+    try:
+        with open(Path(db_path).with_suffix('.manifest.json'), 'r', encoding='utf-8') as f:
+            return json.load(f).get('options', {})
+    except (OSError, ValueError):
+        return {}
+
+def verify_database(db_path=DB_FILE):
+    """
+    Print what the database contains and check it.
+
+    Returns:
+        False if the integrity check fails or a required table, column or
+        index is missing, otherwise True
+    """
+    ok = True
+    conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
 
     # Get all tables
@@ -38,9 +64,20 @@ def verify_database():
     missing = set(expected_tables) - set(tables)
     if missing:
         print(f"\n[WARN] Missing tables: {missing}")
+        ok = False
     else:
         print("\n[OK] All 22 entity tables present!")
 
+    # Side tables the build options asked for
+    options = build_options(db_path)
+    generated_tables = [table for table, option in GENERATED_TABLES.items() if options.get(option)]
+    missing = [table for table in generated_tables if table not in tables]
+    if missing:
+        print(f"[WARN] Missing generated tables: {missing} (not built by generate_database.py?)")
+        ok = False
+    elif generated_tables:
+        print(f"[OK] Generated side tables present: {generated_tables}")
+
     # Check ayahs table has transliteration column
     cursor.execute("PRAGMA table_info(ayahs)")
     ayah_columns = [row[1] for row in cursor.fetchall()]
@@ -48,6 +85,7 @@ def verify_database():
         print("[OK] Ayahs table has transliteration column")
     else:
         print("[WARN] Ayahs table missing transliteration column")
+        ok = False
 
     # Check ayahs table has data with transliteration
     cursor.execute("SELECT COUNT(*) FROM ayahs WHERE transliteration IS NOT NULL")
@@ -84,12 +122,22 @@ def verify_database():
             print(f"  [OK] {idx}")
         else:
             print(f"  [WARN] Missing: {idx}")
+            ok = False
+
+    result = cursor.execute("PRAGMA integrity_check").fetchone()[0]
+    if result == 'ok':
+        print("\n[OK] Integrity check")
+    else:
+        print(f"\n[WARN] Integrity check failed: {result}")
+        ok = False
 
     conn.close()
 
     print("\n" + "=" * 60)
-    print("Verification Complete")
+    print("Verification Complete" if ok else "Verification FAILED")
     print("=" * 60)
+    return ok
 
 if __name__ == "__main__":
-    verify_database()
+    if not verify_database():
+        exit(1)